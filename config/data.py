@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import logging
+import os
 from dataclasses import dataclass
 from dataclasses import field
 from pathlib import Path
 from pprint import pformat
 from typing import Dict
+from typing import Optional
 
 import yaml
 
@@ -34,8 +36,37 @@ class DataConfig:
     overwrite: bool = True
     save_fig: bool = True
     window_select: int = 6
+    rolling_window: str = '6h'  # time-based window for the *_rolling features
+    rolling_by: Optional[str] = None  # e.g. 'date' to restart windows each day
     ma_windows: list = field(default_factory=lambda: [1, 3, 6, 12, 24])
     lag_windows: list = field(default_factory=lambda: [1, 3, 6, 12, 24])
+    distance_bands: list = field(default_factory=lambda: [0, 1, 2, 3, 5, 10, float('inf')])
+    distance_method: str = 'haversine'  # or 'equirectangular' (city-scale approximation)
+    ped_min_obs: int = 30
+    n_workers: int = os.cpu_count() or 1
+    peak_hours_k: int = 12
+    feature_cache: bool = False  # memoize BuildModelFeatures' date-local steps by input fingerprint
+    incremental: bool = False
+    parallel_features: bool = False  # shard date-local feature steps across n_workers processes
+    low_memory: bool = False  # float32 features and categorical labels, with per-step memory report
+    fit_scalers: bool = True  # False: transform with the bounds saved by the last fitting run
+    validity_mask: bool = True  # defer builder row filters to one mask instead of copying the frame per filter
+    compact_after: list = field(default_factory=list)  # builder steps after which masked rows are dropped early
+    quantile_sketch_k: Optional[int] = None  # exact outlier bounds and percentile flags; or a KLL size, e.g. 1000 (~0.3% rank error)
+    stream_ingest: bool = False  # raw csv -> sdo in ingest_block_mb blocks instead of one read_csv
+    ingest_block_mb: int = 64
+    # Analysis sample: 'last' 10% of rows, or a seeded 'reservoir'/'stratified' draw streamed from process1
+    sample_method: str = 'last'
+    sample_seed: int = 0
+    sample_memory_mb: int = 256
+    sample_chunk_rows: int = 250_000
+    sample_confidence: float = 0.95  # quick-look confidence intervals
+    # Stages stored as hive-partitioned (p_year/p_month/p_date) parquet datasets, e.g. ['sdo', 'process1', 'features1', 'features2', 'result']
+    partitioned: list = field(default_factory=list)
+    date_range: Optional[tuple] = None  # inclusive ('YYYY-MM-DD', 'YYYY-MM-DD') pushed down on partitioned loads
+    feature_cache_memory_mb: int = 2048
+    feature_cache_disk_mb: int = 10240
+    feature_cache_persist: bool = False  # also write cached (full-frame) steps to parquet for later runs
 
 
 @dataclass
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from dataclasses import field
 from typing import Dict
+from typing import List
 from typing import Tuple
 
 
@@ -60,3 +61,25 @@ class ModelConfig:
             (0.2, 1.0): 2.0
         }
     )
+    weekend_multiplier: float = 1.1
+    pricing_backend: str = 'pandas'  # 'pandas' or 'postgres'
+    backtest_train_days: int = 28
+    backtest_test_days: int = 7
+    zone_bounds: Tuple[float, float, float, float] = (40.5, 41.0, -74.3, -73.7)  # lat_min, lat_max, lon_min, lon_max
+    zone_cell_size: float = 0.01  # degrees, ~1.1 km north-south
+    zone_pricing: bool = False  # surge from pickup-zone demand ratios instead of city-wide ones
+
+    def demand_ratio_columns(self) -> Tuple[str, str]:
+        """(mean ratio, max ratio) feature columns that drive the surge and base multipliers"""
+        if self.zone_pricing:
+            return 'zone_3h_cpm_mean_ratio', 'zone_3h_cpm_max_ratio'
+        return '3h_partly_cpm_mean_ratio', '3h_partly_cpm_max_ratio'
+
+    def hour_day_parts(self, hours: int = 3) -> List[str]:
+        """Day part label for each hour 0-23.
+
+        Periods are closed on the right, matching the feature builders' ``pd.cut`` bins
+        (e.g. hour 3 is 'Night' for ``'Night': (0, 3)``).
+        """
+        periods = self.time_periods_3hr if hours == 3 else self.time_periods_6hr
+        return [next((name for name, (_, end) in periods.items() if hour <= end), list(periods)[-1]) for hour in range(24)]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pprint import pformat
+
+from config.model import ModelConfig
+from src.models.quote import measure_latency
+from src.models.quote import QuoteService
+
+QUOTE_FIELDS = ['price', 'day_part_3hr', 'is_weekend', 'mean_ratio', 'max_ratio']
+
+
+def handle_request(service: QuoteService, payload):
+    """Quote a single request dict, or a list of them as one batch."""
+    if isinstance(payload, list):
+        columns = [[item[name] for item in payload] for name in QUOTE_FIELDS]
+        return {'dynamic_price': service.quote_batch(*columns).tolist()}
+    return {'dynamic_price': service.quote(*[payload[name] for name in QUOTE_FIELDS])}
+
+
+def make_handler(service: QuoteService):
+    class QuoteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                self._respond(200, {'status': 'ok'})
+            else:
+                self._respond(404, {'error': f'Unknown path: {self.path}'})
+
+        def do_POST(self):
+            if self.path != '/quote':
+                self._respond(404, {'error': f'Unknown path: {self.path}'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                self._respond(200, handle_request(service, payload))
+            except (KeyError, TypeError, ValueError) as e:
+                self._respond(400, {'error': str(e)})
+
+        def _respond(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return QuoteHandler
+
+
+def serve_http(service: QuoteService, host: str, port: int):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    logging.info(f"Serving quotes on http://{host}:{port}/quote")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def serve_stdio(service: QuoteService):
+    """One JSON request per line on stdin, one JSON response per line on stdout."""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = handle_request(service, json.loads(line))
+        except (KeyError, TypeError, ValueError) as e:
+            response = {'error': str(e)}
+        sys.stdout.write(json.dumps(response) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local quote server for load testing.')
+    parser.add_argument('mode', choices=['http', 'stdio', 'bench'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--n-requests', type=int, default=100_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    quote_service = QuoteService(ModelConfig())
+
+    if args.mode == 'http':
+        serve_http(quote_service, args.host, args.port)
+    elif args.mode == 'stdio':
+        serve_stdio(quote_service)
+    else:
+        logging.info(pformat(measure_latency(quote_service, args.n_requests)))
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import logging
+import time
 import warnings
+from typing import Iterator
+from typing import Optional
 
 import pandas as pd
 
+from config.state_init import StateManager
+from src.data.schema import RawSchema
 from utils.execution import TaskExecutor
+from utils.file_access import FileAccess
 warnings.filterwarnings("ignore")
 
 
@@ -23,10 +30,48 @@ class MakeDataset:
         return df
 
     def base_process(self, df):
-        rename_map = {
-            'Unnamed: 0': 'uid',
-            'pickup_datetime': 'timestamp',
-            'fare_amount': 'price',
-            'passenger_count': 'count'}
-        df = df.rename(columns=rename_map)
-        return df.drop(columns=['key'])
+        """Pipeline column names; ``key`` is only present when the csv was read untyped"""
+        df = df.rename(columns=RawSchema.rename_map())
+        return df.drop(columns=['key'], errors='ignore')
+
+
+class RawIngest:
+    """raw csv -> sdo, typed by the ``RawSchema`` registry while it is parsed.
+
+    ``pipeline`` reads the whole csv at once. ``stream`` reads blocks of ``ingest_block_mb``, so the csv
+    never has to fit in memory: each block goes through ``MakeDataset`` on its own and is appended to
+    ``sdo`` as parquet row groups (hive partitions when ``sdo`` is partitioned). Both log MB/s.
+    """
+
+    def __init__(self, state: StateManager):
+        self.dc = state.data_config
+        self.raw_path = state.paths.get_path('raw')
+        self.sdo_path = state.paths.get_path('sdo')
+        self.n_rows = 0
+
+    def pipeline(self, df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        start = time.perf_counter()
+        df = MakeDataset().pipeline(FileAccess.load_csv(self.raw_path, RawSchema.convert_options()))
+        self.n_rows = len(df)
+        self.log_throughput(start)
+        return df
+
+    def stream(self, df: Optional[pd.DataFrame] = None) -> None:
+        if self.dc.overwrite is False and self.sdo_path.exists():
+            logging.warning(f'File already exists: ``{self.sdo_path}``')
+            return
+        start = time.perf_counter()
+        FileAccess.save_chunks(self.blocks(), self.sdo_path, partitioned='sdo' in self.dc.partitioned)
+        self.log_throughput(start)
+
+    def blocks(self) -> Iterator[pd.DataFrame]:
+        processor = MakeDataset()
+        for block in FileAccess.iter_csv_blocks(self.raw_path, self.dc.ingest_block_mb, RawSchema.convert_options()):
+            block = processor.pipeline(block)
+            self.n_rows += len(block)
+            yield block
+
+    def log_throughput(self, start: float):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        size_mb = self.raw_path.stat().st_size / 1024**2
+        logging.info(f"Ingested {self.n_rows} rows ({size_mb:.1f} MB of csv) in {elapsed:.1f}s: {size_mb / elapsed:.1f} MB/s")
@@ -4,6 +4,7 @@ import io
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import datetime
+from pathlib import Path
 from pprint import pprint
 from typing import Dict
 from typing import List
@@ -11,6 +12,8 @@ from typing import Optional
 
 import pandas as pd
 
+from utils.file_access import FileAccess
+
 
 @dataclass
 class ColumnMetadata:
@@ -135,6 +138,6 @@ def create_dataset_metadata(df: pd.DataFrame) -> DatasetMetadata:
 
 
 if __name__ == "__main__":
-    df = pd.read_parquet('data/sdo/uber.parquet')
-    uber_metadata = create_dataset_metadata(df)
+    with FileAccess.load_file(Path('data/sdo/uber.parquet')) as df:
+        uber_metadata = create_dataset_metadata(df)
     pprint(uber_metadata)
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
 import logging
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from src.data.schema import RAW_TIME_ZONE
+from src.data.schema import RAW_TIMESTAMP_FORMAT
 from utils.execution import TaskExecutor
+from utils.quantile_sketch import quantiles
+
+# (column, low quantile, high quantile, side removed) for the IQR outlier rule
+OUTLIER_RULES = [('count', .1, .9, 'High'), ('price', .25, .75, 'Low')]
 
 
 class InitialProcessor:
     """Process extreme outliers, datetimes, timezone and sorting"""
 
-    def __init__(self):
-        pass
+    def __init__(self, sketch_k: Optional[int] = None):
+        self.sketch_k = sketch_k
 
     def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         logging.debug(f'Preprocess shape: {df.shape}')
@@ -28,16 +36,15 @@ class InitialProcessor:
         return df
 
     def remove_outliers(self, df):
-        df_ex1 = self.retrieve_extremes(df, 'count', .1, .9, 'High')
-        df_ex2 = self.retrieve_extremes(df, 'price', .25, .75, 'Low')
-        for df_ex in [df_ex1, df_ex2]:
+        extremes = [self.retrieve_extremes(df, col, low_q, high_q, extreme, self.sketch_k) for col, low_q, high_q, extreme in OUTLIER_RULES]
+        for df_ex in extremes:
             df = self.remove_extremes(df, df_ex)
         return df.dropna()
 
     @staticmethod
-    def retrieve_extremes(df, col, low_q, high_q, extreme=None):
-        q1 = df[col].quantile(low_q)
-        q3 = df[col].quantile(high_q)
+    def retrieve_extremes(df, col, low_q, high_q, extreme=None, sketch_k=None):
+        """Rows beyond the IQR fences; quartiles come from a quantile sketch unless ``sketch_k`` is None"""
+        q1, q3 = quantiles(df[col], [low_q, high_q], sketch_k)
         iqr = q3 - q1
         low = q1 - 1.5*iqr
         high = q3 + 1.5*iqr
@@ -56,19 +63,23 @@ class InitialProcessor:
 
     @staticmethod
     def convert_dt(df):
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        """Timestamps are parsed at read time; text (an sdo written before the raw schema) with its exact format"""
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'], format=RAW_TIMESTAMP_FORMAT)
         return df
 
     @staticmethod
     def handle_timezone(df):
-        df['time_zone'] = df['timestamp'].dt.tz
-        df['time_zone'] = df['time_zone'].astype(str)
-        df['timestamp'] = df['timestamp'].dt.tz_convert(None)
+        """Naive UTC timestamps, with the zone kept as a one-category label"""
+        if df['timestamp'].dt.tz is not None:
+            df['timestamp'] = df['timestamp'].dt.tz_convert(None)
+        df['time_zone'] = pd.Categorical.from_codes(np.zeros(len(df), dtype='int8'), categories=[RAW_TIME_ZONE])
         return df
 
     @staticmethod
     def sort_by_dt(df):
-        return df.sort_values(by='timestamp')
+        """Deterministic order (uid breaks timestamp ties), so unchanged dates keep identical rows across runs"""
+        return df.sort_values(by=['timestamp', 'uid'], kind='stable')
 
     @staticmethod
     def remove_duplicates(df):
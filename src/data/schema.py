@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Dict
+
+import pyarrow as pa
+import pyarrow.csv as pv
+
+RAW_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S UTC'
+RAW_TIME_ZONE = 'UTC'
+
+# Raw csv column -> (pipeline name, type it is parsed to). Columns not listed (``key``) are never read.
+RAW_SCHEMA: Dict[str, tuple] = {
+    'Unnamed: 0': ('uid', pa.int64()),
+    'fare_amount': ('price', pa.float64()),
+    'pickup_datetime': ('timestamp', pa.timestamp('ns')),
+    'pickup_longitude': ('pickup_longitude', pa.float32()),
+    'pickup_latitude': ('pickup_latitude', pa.float32()),
+    'dropoff_longitude': ('dropoff_longitude', pa.float32()),
+    'dropoff_latitude': ('dropoff_latitude', pa.float32()),
+    'passenger_count': ('count', pa.int16()),
+}
+
+
+class RawSchema:
+    """Typed reading of the raw Uber csv.
+
+    Every column is converted by pyarrow while the csv is parsed: coordinates straight to float32,
+    passenger counts to int16, and ``pickup_datetime`` with the exact ``RAW_TIMESTAMP_FORMAT`` to naive
+    UTC timestamps. No column is inferred and none passes through object strings.
+    """
+
+    @staticmethod
+    def convert_options() -> pv.ConvertOptions:
+        return pv.ConvertOptions(
+            column_types={col: dtype for col, (_, dtype) in RAW_SCHEMA.items()},
+            include_columns=list(RAW_SCHEMA),
+            timestamp_parsers=[RAW_TIMESTAMP_FORMAT])
+
+    @staticmethod
+    def rename_map() -> Dict[str, str]:
+        return {col: name for col, (name, _) in RAW_SCHEMA.items()}
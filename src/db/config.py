@@ -26,8 +26,13 @@ def db_creds():
 class DatabaseState:
     insert_file: str = os.getenv('INSERT_FILE')
     fetch_file: str = os.getenv('FETCH_FILE')
+    features_table: str = os.getenv('POSTGRES_FEATURES_TABLE', 'trip_features')
+    load_features: bool = True
+    pricing_table: str = os.getenv('POSTGRES_PRICING_TABLE', 'dynamic_prices')
+    pricing_view: bool = False
     batch_size: int = 100000
     chunk_size: int = 5_000_000
+    parity_sample_size: int = 10_000
 
     admin_creds: dict = field(init=False)
     db_info: dict = field(init=False)
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import logging
+from io import StringIO
 
+import numpy as np
 import pandas as pd
+import psycopg2
 
+from config.model import ModelConfig
 from src.db.config import DatabaseState
+from src.db.connection import DatabaseConnection
 from src.db.data_handling import DataHandler
 from src.db.operations import DatabaseOperations
+from src.db.pricing_sql import PricingSQLCompiler
+from src.models.pricing_engine import PricingEngine
 
 
 class InsertPipeline:
@@ -68,3 +75,100 @@ class FetchPipeline:
             logging.exception(f'Error: {e}', exc_info=e)
             raise
         logging.info('Completed Data Pipeline')
+
+
+class SQLPricingPipeline:
+    """Apply DynamicPricing inside Postgres, so priced rows never leave the database.
+
+    The pricing SQL reads the model features from ``features_table`` (``POSTGRES_FEATURES_TABLE``).
+    ``pipeline(df)`` first replaces that table with ``df`` (features2, via COPY); with ``load_features``
+    off, DataPipeline passes no frame and the table must already hold the features2 columns.
+    """
+
+    def __init__(self, db_state: DatabaseState, db_connection: DatabaseConnection, mc: ModelConfig):
+        self.engine = db_connection.engine
+        self.pgsql_pool = db_connection.pgsql_pool
+        self.operations = DatabaseOperations(db_state, db_connection)
+        self.schema = db_state.schema
+        self.source = db_state.features_table
+        self.batch_size = db_state.batch_size
+        self.target = db_state.pricing_table
+        self.as_view = db_state.pricing_view
+        self.sample_size = db_state.parity_sample_size
+        self.mc = mc
+        self.compiler = PricingSQLCompiler(mc)
+
+    def load_features(self, df: pd.DataFrame):
+        """Replace ``features_table`` with the rows of ``df``, copied in ``batch_size`` CSV batches."""
+        columns = [(col, self.operations._map_dtype(dtype)) for col, dtype in df.dtypes.items()]
+        conn = self.pgsql_pool.getconn()
+        try:
+            cur = conn.cursor()
+            cur.execute(f"SET search_path TO {self.schema};")
+            cur.execute(self.compiler.drop_relation(self.source))
+            cur.execute(self.compiler.features_table(self.source, columns))
+            copy = self.compiler.copy_rows(self.source, df.columns)
+            for start in range(0, len(df), self.batch_size):
+                buffer = StringIO()
+                df.iloc[start:start + self.batch_size].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cur.copy_expert(copy, buffer)
+            conn.commit()
+            logging.info(f"SUCCESS: Loaded {len(df)} feature rows into {self.source}.")
+        except (Exception, psycopg2.DatabaseError) as error:
+            conn.rollback()
+            logging.error(f"Failed to load features: {error}")
+            raise
+        finally:
+            cur.close()
+            self.pgsql_pool.putconn(conn)
+
+    def pricing_statements(self):
+        """Recreate the target on every run, so its CASE rules always match the current ModelConfig.
+
+        The drop handles a table and a materialized view alike, so ``pricing_view`` can be toggled between runs.
+        """
+        if self.as_view:
+            return [
+                self.compiler.drop_relation(self.target),
+                self.compiler.materialized_view(self.source, self.target),
+                self.compiler.refresh_view(self.target)]
+        return [
+            self.compiler.drop_relation(self.target),
+            self.compiler.create_table(self.source, self.target),
+            self.compiler.insert_select(self.source, self.target)]
+
+    def price_in_database(self):
+        conn = self.pgsql_pool.getconn()
+        try:
+            cur = conn.cursor()
+            cur.execute(f"SET search_path TO {self.schema};")
+            for statement in self.pricing_statements():
+                logging.debug(f"Executing pricing SQL: {statement}")
+                cur.execute(statement)
+            conn.commit()
+            logging.info(f"SUCCESS: Priced {self.source} into {self.target} in-database.")
+        except (Exception, psycopg2.DatabaseError) as error:
+            conn.rollback()
+            logging.error(f"Failed to price in-database: {error}")
+            raise
+        finally:
+            cur.close()
+            self.pgsql_pool.putconn(conn)
+
+    def parity_check(self):
+        """Re-price a random sample with the pandas engine and compare against the SQL prices."""
+        query = f"SELECT * FROM {self.schema}.{self.target} ORDER BY random() LIMIT {self.sample_size};"
+        sample = pd.read_sql_query(query, self.engine)
+        expected = PricingEngine(self.mc).price(sample)
+        max_diff = float(np.max(np.abs(sample['dynamic_price'].to_numpy() - expected))) if len(sample) else 0.0
+        logging.info(f"Parity check on {len(sample)} rows: max abs difference {max_diff:.3g}")
+        if not np.allclose(sample['dynamic_price'].to_numpy(), expected, rtol=1e-12, atol=1e-9):
+            raise ValueError(f"SQL pricing diverges from pandas engine (max abs difference {max_diff})")
+        return max_diff
+
+    def pipeline(self, df=None):
+        if df is not None:
+            self.load_features(df)
+        self.price_in_database()
+        self.parity_check()
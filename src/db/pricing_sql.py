@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from config.model import ModelConfig
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def float_literal(value: float) -> str:
+    """Shortest round-trip repr as float8, so Postgres arithmetic matches numpy float64."""
+    return f"{float(value)!r}::float8"
+
+
+class PricingSQLCompiler:
+    """Compile ModelConfig pricing rules into SQL matching DynamicPricing row for row."""
+
+    def __init__(self, mc: ModelConfig):
+        self.mc = mc
+
+    def ratio_case(self, column: str, bins: Dict[Tuple[float, float], float]) -> str:
+        # CASE branches are tried in order, like the first-match loop over the bins dict
+        branches = ' '.join(
+            f"WHEN {float_literal(lower)} <= {column} AND {column} < {float_literal(upper)} THEN {float_literal(multiplier)}"
+            for (lower, upper), multiplier in bins.items())
+        return f"CASE {branches} ELSE {float_literal(1.0)} END"
+
+    def surge_multiplier(self, column: Optional[str] = None) -> str:
+        column = column or self.mc.demand_ratio_columns()[0]
+        return self.ratio_case(quote_ident(column), self.mc.mean_ratio_bins)
+
+    def base_multiplier(self, column: Optional[str] = None) -> str:
+        column = column or self.mc.demand_ratio_columns()[1]
+        return self.ratio_case(quote_ident(column), self.mc.max_ratio_bins)
+
+    def time_multiplier(self, column: str = 'day_part_3hr') -> str:
+        branches = ' '.join(
+            f"WHEN {quote_literal(part)} THEN {float_literal(multiplier)}"
+            for part, multiplier in self.mc.day_parts.items())
+        return f"CASE {quote_ident(column)} {branches} ELSE {float_literal(1.0)} END"
+
+    def weekend_multiplier(self, column: str = 'is_weekend') -> str:
+        return f"CASE WHEN {quote_ident(column)} <> 0 THEN {float_literal(self.mc.weekend_multiplier)} ELSE {float_literal(1.0)} END"
+
+    def dynamic_price(self, price_column: str = 'price') -> str:
+        demand_multiplier = f"GREATEST({self.base_multiplier()}, {self.surge_multiplier()})"
+        final_multiplier = f"(({self.time_multiplier()} + {demand_multiplier} + {self.weekend_multiplier()}) / {float_literal(3)})"
+        return f"{quote_ident(price_column)} * {final_multiplier}"
+
+    def select(self, source: str) -> str:
+        return f"SELECT src.*, {self.dynamic_price()} AS dynamic_price FROM {source} AS src"
+
+    def drop_relation(self, target: str) -> str:
+        """Drop ``target`` whether it is a table, view or materialized view.
+
+        ``DROP TABLE IF EXISTS`` errors when the name is a materialized view and vice versa, which happens
+        after toggling ``pricing_view``, so the kind is looked up in pg_class first.
+        """
+        name = quote_literal(target)
+        return (
+            "DO $$ DECLARE kind \"char\" := (SELECT relkind FROM pg_class WHERE oid = to_regclass(" + name + ")); "
+            "BEGIN "
+            "IF kind = 'm' THEN EXECUTE 'DROP MATERIALIZED VIEW ' || " + name + "; "
+            "ELSIF kind = 'v' THEN EXECUTE 'DROP VIEW ' || " + name + "; "
+            "ELSIF kind IN ('r', 'p') THEN EXECUTE 'DROP TABLE ' || " + name + "; "
+            "END IF; END $$;")
+
+    def features_table(self, table: str, columns: Iterable[Tuple[str, str]]) -> str:
+        """Empty table for the feature rows, from (column, SQL type) pairs."""
+        return f"CREATE TABLE {table} ({', '.join(f'{quote_ident(col)} {sql_type}' for col, sql_type in columns)});"
+
+    def copy_rows(self, table: str, columns: Iterable[str]) -> str:
+        return f"COPY {table} ({', '.join(quote_ident(col) for col in columns)}) FROM STDIN WITH (FORMAT csv);"
+
+    def create_table(self, source: str, target: str) -> str:
+        return f"CREATE TABLE {target} AS {self.select(source)} WITH NO DATA;"
+
+    def insert_select(self, source: str, target: str) -> str:
+        return f"INSERT INTO {target} {self.select(source)};"
+
+    def materialized_view(self, source: str, view: str) -> str:
+        return f"CREATE MATERIALIZED VIEW {view} AS {self.select(source)} WITH NO DATA;"
+
+    def refresh_view(self, view: str) -> str:
+        return f"REFRESH MATERIALIZED VIEW {view};"
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def encode_column(col: pd.Series) -> Tuple[np.ndarray, int]:
+    """Dense integer codes for a key column (-1 for missing) and the number of levels."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy().astype('int64'), len(col.cat.categories)
+    if pd.api.types.is_datetime64_any_dtype(col):
+        days = col.to_numpy(dtype='datetime64[D]').astype('int64')
+        missing = col.isna().to_numpy()
+        if missing.all():
+            return np.full(len(col), -1, dtype='int64'), 0
+        start = days[~missing].min()
+        return np.where(missing, -1, days - start), int(days[~missing].max() - start) + 1
+    values = col.to_numpy(dtype='int64')
+    start = values.min() if len(values) else 0
+    return values - start, int(values.max() - start) + 1 if len(values) else 0
+
+
+class GroupedAggregator:
+    """Group aggregates over integer-encoded keys in one sorted pass, broadcast back by key index.
+
+    Keys are combined into a single mixed-radix code, rows are sorted by it once (skipped when the
+    frame is already in key order) and every statistic is one ``reduceat`` over the same segments.
+    """
+
+    def __init__(self, df: pd.DataFrame, keys: List[str]):
+        self._build([encode_column(df[name]) for name in keys], len(df))
+
+    @classmethod
+    def from_codes(cls, codes: List[Tuple[np.ndarray, int]]) -> GroupedAggregator:
+        """Aggregator over pre-encoded ``(codes, n_levels)`` keys."""
+        groups = cls.__new__(cls)
+        groups._build(codes, len(codes[0][0]))
+        return groups
+
+    def _build(self, key_codes: List[Tuple[np.ndarray, int]], n_rows: int):
+        self.key = np.zeros(n_rows, dtype='int64')
+        missing = np.zeros(n_rows, dtype=bool)
+        self.n_groups = 1
+        for codes, n_levels in key_codes:
+            missing |= codes < 0
+            self.key = self.key * n_levels + codes
+            self.n_groups *= n_levels
+        self.key[missing] = -1
+
+        valid = ~missing
+        sorted_key = self.key if np.all(self.key[1:] >= self.key[:-1]) else None
+        if sorted_key is None:
+            # Few groups: a 16-bit key lets numpy use its O(n) radix sort
+            sort_key = self.key.astype('int16') if self.n_groups < 2**15 else self.key
+            self.order = np.argsort(sort_key, kind='stable')
+            self.order = self.order[valid[self.order]]
+            sorted_key = self.key[self.order]
+        else:
+            self.order = np.flatnonzero(valid) if missing.any() else None
+            sorted_key = self.key[valid]
+        self.starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]]) if len(sorted_key) else np.array([], dtype='int64')
+        self.groups = sorted_key[self.starts]
+
+    def _sorted(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype='float64')
+        return values if self.order is None else values[self.order]
+
+    def _dense(self, reduced: np.ndarray) -> np.ndarray:
+        result = np.full(self.n_groups, np.nan)
+        result[self.groups] = reduced
+        return result
+
+    def count(self) -> np.ndarray:
+        return self._dense(np.diff(np.r_[self.starts, len(self.key) if self.order is None else len(self.order)]))
+
+    def aggregate(self, values, stats: List[str]) -> Dict[str, np.ndarray]:
+        """Dense per-group arrays for any of ``sum``, ``count``, ``max``, ``min``, ``mean`` (NaN-skipping, like pandas)."""
+        if len(self.starts) == 0:
+            return {stat: np.full(self.n_groups, np.nan) for stat in stats}
+        values = self._sorted(values)
+        nan_mask = np.isnan(values)
+        has_nan = nan_mask.any()
+        result = {}
+        if 'sum' in stats or 'mean' in stats:
+            result['sum'] = self._dense(np.add.reduceat(np.where(nan_mask, 0.0, values) if has_nan else values, self.starts))
+        if 'max' in stats:
+            result['max'] = self._dense(np.fmax.reduceat(values, self.starts))
+        if 'min' in stats:
+            result['min'] = self._dense(np.fmin.reduceat(values, self.starts))
+        if 'count' in stats or 'mean' in stats:
+            result['count'] = self._dense(np.add.reduceat((~nan_mask).astype('float64'), self.starts)) if has_nan else self.count()
+        if 'mean' in stats:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result['mean'] = result['sum'] / result['count']
+        return {stat: result[stat] for stat in stats}
+
+    def broadcast(self, group_values: np.ndarray) -> np.ndarray:
+        """Per-row values of a dense per-group array (NaN for rows with a missing key)."""
+        return np.append(group_values, np.nan)[self.key]
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import logging
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -7,7 +9,10 @@ import seaborn as sns
 from sklearn.preprocessing import MinMaxScaler
 
 from config.state_init import StateManager
+from src.features.peak_hours import PeakHourIndex
+from src.features.rollup_cube import TimeRollupCube
 from utils.execution import TaskExecutor
+from utils.file_access import FileAccess
 sns.set_theme(style="whitegrid")
 
 
@@ -17,6 +22,8 @@ class AnalyseBounds:
     def __init__(self, state: StateManager):
         self.mc = state.model_config
         self.scaler = MinMaxScaler()
+        self.index_path = state.paths.get_path('bound_hours')
+        self.cube_path = state.paths.get_path('rollup_cube')
 
     def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         steps = [
@@ -34,8 +41,32 @@ class AnalyseBounds:
         for step in steps:
             step_func, args = step
             TaskExecutor.run_child_step(step_func, df, args)
+        self.log_peak_hours()
+        self.log_day_part_summary()
         return df
 
+    def log_day_part_summary(self):
+        """Per day part price/demand summary read from the rollup cube, not the trip rows."""
+        if not self.cube_path.exists():
+            logging.warning(f"No rollup cube at ``{self.cube_path}``")
+            return
+        with FileAccess.load_file(self.cube_path) as cube:
+            cells = TimeRollupCube.slice(cube, '3h')
+            summary = cells.groupby('period', sort=False).agg(
+                ppm_sum=('ppm_sum', 'sum'), ppm_count=('ppm_count', 'sum'), cpm_sum=('cpm_sum', 'sum'),
+                cpm_max=('cpm_max', 'max'), days=('date', 'nunique'))
+        summary['ppm_mean'] = summary['ppm_sum'] / summary['ppm_count']
+        summary['cpm_daily_mean'] = summary['cpm_sum'] / summary['days']
+        logging.info(f"Day part summary:\n{summary[['ppm_mean', 'cpm_daily_mean', 'cpm_max']]}")
+
+    def log_peak_hours(self):
+        if not self.index_path.exists():
+            logging.warning(f"No peak hour index at ``{self.index_path}``")
+            return
+        index = PeakHourIndex.read(self.index_path)
+        for ranking in ['max_count_hour', 'min_count_hour', 'max_ppm_hour', 'min_ppm_hour']:
+            logging.info(f"{ranking}: {PeakHourIndex.hours(index, ranking)}")
+
     def analyze_and_plot_ratio_distributions(self, df, time_periods, window_size, bins, ratio_columns):
         for ratio_column in ratio_columns:
             ratio_counts = self.analyze_ratio_distribution(df, ratio_column, time_periods, bins)
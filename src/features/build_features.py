@@ -1,29 +1,64 @@
 from __future__ import annotations
 
-import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
 
 from config.state_init import StateManager
+from src.features.calendar import CalendarDimension
+from src.features.lags import GroupedLags
+from src.features.memory import MemoryReport
+from src.features.parallel import ParallelDateExecutor
+from src.features.partitions import DatePartitionStore
+from src.features.rolling import RollingWindow
+from src.features.rollup_cube import CUBE_COLUMNS
+from src.features.scaling import FeatureScaler
+from src.features.trip_features import TripFeatureSteps
+from src.features.validity import ValidityMask
 from utils.execution import TaskExecutor
+from utils.quantile_sketch import quantiles
 
 # @log_all_methods
 
 
-class BuildAnalysisFeatures:
+class BuildAnalysisFeatures(TripFeatureSteps):
     """Build/compose Extensive features for analysis"""
 
     def __init__(self, state: StateManager):
         self.dc = state.data_config
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self.mc = state.model_config
+        self.scaler_path = state.paths.get_path('scalers') / 'analysis_features.json'
+        self.scaler = FeatureScaler() if self.dc.fit_scalers else FeatureScaler.load(self.scaler_path)
+        self.calendar = CalendarDimension(self.mc, low_memory=self.dc.low_memory)
+        self.float_dtype = 'float32' if self.dc.low_memory else 'float64'
+        self.memory = MemoryReport(type(self).__name__) if self.dc.low_memory else None
+        self.validity = ValidityMask(type(self).__name__, enabled=self.dc.validity_mask, checkpoints=self.dc.compact_after)
+        # Built from a sample, so no other builder reuses these steps
+        self.cache = None
+        self.cube = None
+        self.cube_columns = tuple(CUBE_COLUMNS)
+        self.cached_steps = []
+        self.n_rows = None
+        self.executor = None
+        if self.dc.parallel_features and self.dc.n_workers > 1:
+            self.executor = ParallelDateExecutor(self.dc.n_workers)
+        self.partitions = None
+        if self.dc.incremental:
+            self.partitions = DatePartitionStore(
+                state.paths.get_path('partitions') / 'analysis_features', salt=repr((self.dc, self.mc)), executor=self.executor)
 
     def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
-        steps = [
-            self.sample_data,
+        self.n_rows = len(df)
+        df = TaskExecutor.run_child_step(self.sample_data, df)
+        # Date-local base features (one date at a time in incremental mode, in date shards across processes
+        # in parallel mode)
+        partition_steps = [
+            self.build_low_memory_dtypes,
             self.build_dt_features,
             self.build_haversine_distance,
             self.build_price_per_mile,
             self.build_count_per_mile,
+        ]
+        global_steps = [
+            self.build_dt_analysis_features,
             self.build_demand_features,
             self.build_bound_features,
             self.build_ratios,
@@ -33,56 +68,29 @@ class BuildAnalysisFeatures:
             self.build_lagged_features,
             self.round_and_optimize_df
         ]
-        for step in steps:
-            df = TaskExecutor.run_child_step(step, df)
-        return df
+        if self.partitions is not None or self.executor is not None:
+            # Date partitions are concatenated afterwards, so each is compacted where it is built
+            partition_steps.append(self.compact_valid_rows)
+        if self.partitions is not None:
+            df = self.partitions.run(partition_steps, df)
+            return self.run_steps(global_steps, self.record_memory('date-local steps', df))
+        if self.executor is not None:
+            df = self.executor.run(partition_steps, df)
+            return self.run_steps(global_steps, self.record_memory('date-local steps', df))
+        return self.run_steps(partition_steps + global_steps, df)
 
     def sample_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """The data will become very large once features are built. So we take a sample here."""
-        return df[-int((len(df)*0.1)):]
-
-    def build_dt_features(self, df):
-        df['hour'] = df['timestamp'].dt.hour.astype('int32')
-        df['date'] = df['timestamp'].dt.date.astype('datetime64[ns]')
-        df['week'] = df['timestamp'].dt.isocalendar().week.astype('UInt32')
-        df['month'] = df['timestamp'].dt.month.astype('int32')
-        df['dow'] = df['timestamp'].dt.day_name().str[:3]
-        df['dow_num'] = df['timestamp'].dt.dayofweek
-        df['date_hour'] = df['timestamp'].dt.strftime('%Y-%m-%d %H').astype('datetime64[ns]')
-        df['is_weekend'] = df['dow_num'].isin([5, 6]).astype(int)
-        df['day_part_6hr'] = pd.cut(
-            df['hour'], bins=[-1, 6, 12, 18, 23],
-            labels=['Night', 'Morning', 'Afternoon', 'Evening'])
-        df['day_part_3hr'] = pd.cut(
-            df['hour'], bins=[-1, 3, 6, 9, 12, 15, 18, 21, 23],
-            labels=['Night', 'Early Morning', 'Morning', 'Early Afternoon', 'Afternoon', 'Early Evening', 'Evening', 'Early Night'])
-        return df
-
-    def calc_haversine_distance(self, lat1, lon1, lat2, lon2):
-        R = 3959  # Earth radius in miles
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        return R * c
-
-    def build_haversine_distance(self, df):
-        df['distance'] = self.calc_haversine_distance(
-            df['pickup_latitude'], df['pickup_longitude'],
-            df['dropoff_latitude'], df['dropoff_longitude'])
-        return df
+        """The data will become very large once features are built. So we take a sample here, before any are.
 
-    def build_price_per_mile(self, df):
-        df['price_per_mile'] = df['price'] / df['distance']
-        df = df[(df['price_per_mile'] > 0) & (df['price_per_mile'] < 100)]
-        return df
+        Keeps the last 10% of the input rows. Other ``sample_method``s are drawn by TripSampler before the
+        builder runs, so the input already is the sample."""
+        n_sample = int(self.n_rows * 0.1)
+        if n_sample == 0 or self.dc.sample_method != 'last':
+            return df
+        return df.iloc[-n_sample:]
 
-    def build_count_per_mile(self, df):
-        df['count_per_mile'] = df['count'] / df['distance']
-        df = df[(df['count_per_mile'] > 0) & (df['count_per_mile'] < 100)]
-        return df
+    def build_dt_analysis_features(self, df):
+        return self.calendar.attach(df, ['month', 'dow', 'day_part_6hr'])
 
     def build_pct_change(self, df):
         df['pct_change_ppm'] = df['price_per_mile'].pct_change()
@@ -90,88 +98,42 @@ class BuildAnalysisFeatures:
         return df
 
     def build_demand_features(self, df):
-        # Hourly demand
-        hourly_demand = df.groupby(['date', 'hour'])['count_per_mile'].sum().reset_index()
-        hourly_demand = hourly_demand.groupby(['date', 'hour'])['count_per_mile'].mean().reset_index()
-        hourly_demand.columns = ['date', 'hour', 'avg_hourly_demand']
-
-        # Day part demand
-        df['date'] = pd.to_datetime(df['date'])
-        day_part_3hr_demand = df.groupby(['date', 'day_part_3hr'])['count_per_mile'].sum().reset_index()
-        day_part_3hr_demand = day_part_3hr_demand.groupby(['date', 'day_part_3hr'])['count_per_mile'].mean().reset_index()
-        day_part_3hr_demand.columns = ['date', 'day_part_3hr', 'avg_day_part_3hr_demand']
-
-        day_part_6hr_demand = df.groupby(['date', 'day_part_6hr'])['count_per_mile'].sum().reset_index()
-        day_part_6hr_demand = day_part_6hr_demand.groupby(['date', 'day_part_6hr'])['count_per_mile'].mean().reset_index()
-        day_part_6hr_demand.columns = ['date', 'day_part_6hr', 'avg_day_part_6hr_demand']
-
-        # Daily demand
-        daily_demand = df.groupby(['date', 'dow_num'])['count_per_mile'].sum().reset_index()
-        daily_demand = daily_demand.groupby(['date', 'dow_num'])['count_per_mile'].mean().reset_index()
-        daily_demand.columns = ['date', 'dow_num', 'avg_daily_demand']
-
-        # Merge features back to the original dataframe
-        df = pd.merge(df, hourly_demand, on=['date', 'hour'], how='left')
-        df = pd.merge(df, day_part_3hr_demand, on=['date', 'day_part_3hr'], how='left')
-        df = pd.merge(df, day_part_6hr_demand, on=['date', 'day_part_6hr'], how='left')
-        df = pd.merge(df, daily_demand, on=['date', 'dow_num'], how='left')
-
-        # Forward fill to ensure each hour has a value
-        df = df.sort_values(['date', 'hour'])
-        df['avg_day_part_3hr_demand'] = df.groupby('date')['avg_day_part_3hr_demand'].ffill()
-        df['avg_day_part_6hr_demand'] = df.groupby('date')['avg_day_part_6hr_demand'].ffill()
-        df['avg_daily_demand'] = df.groupby('date')['avg_daily_demand'].ffill()
-
-        return df
+        df.index = pd.RangeIndex(len(df))
+        cube = self.time_cube(df)
+        demand_levels = {
+            'avg_hourly_demand': 'hour',
+            'avg_day_part_3hr_demand': '3h',
+            'avg_day_part_6hr_demand': '6h',
+            'avg_daily_demand': 'day',
+        }
+        for col, level in demand_levels.items():
+            df[col] = cube.broadcast(level, 'count_per_mile', 'sum', self.float_dtype)
+
+        # Rows must be in (date, hour) order
+        return self.sort_by_hour(df)
 
     def build_bound_features(self, df):
         df['date'] = pd.to_datetime(df['date'])
         df['date_hour'] = pd.to_datetime(df['date_hour'])
-
-        df_hourly = df.groupby(['date', 'hour']).agg({
-            'price_per_mile': ['mean', 'max', 'min'],
-            'count_per_mile': ['sum', 'max', 'min', 'mean']
-        }).reset_index()
-
-        df_day_part_6hr = df.groupby(['date', 'day_part_6hr']).agg({
-            'price_per_mile': ['mean', 'max', 'min'],
-            'count_per_mile': ['sum', 'max', 'min', 'mean']
-        }).reset_index()
-
-        df_day_part_3hr = df.groupby(['date', 'day_part_3hr']).agg({
-            'price_per_mile': ['mean', 'max', 'min'],
-            'count_per_mile': ['sum', 'max', 'min', 'mean']
-        }).reset_index()
-
-        df_daily = df.groupby('date').agg({
-            'price_per_mile': ['mean', 'max', 'min'],
-            'count_per_mile': ['sum', 'max', 'min', 'mean']
-        }).reset_index()
-
-        df_hourly.columns = [
-            'date', 'hour', 'hourly_ppm_mean', 'hourly_ppm_max', 'hourly_ppm_min',
-            'hourly_cpm_sum', 'hourly_cpm_max', 'hourly_cpm_min', 'hourly_cpm_mean']
-        df_day_part_3hr.columns = [
-            'date', 'day_part_3hr', '3h_partly_ppm_mean', '3h_partly_ppm_max', '3h_partly_ppm_min',
-            '3h_partly_cpm_sum', '3h_partly_cpm_max', '3h_partly_cpm_min', '3h_partly_cpm_mean']
-        df_day_part_6hr.columns = [
-            'date', 'day_part_6hr', '6h_partly_ppm_mean', '6h_partly_ppm_max', '6h_partly_ppm_min',
-            '6h_partly_cpm_sum', '6h_partly_cpm_max', '6h_partly_cpm_min', '6h_partly_cpm_mean']
-        df_daily.columns = [
-            'date', 'daily_ppm_mean', 'daily_ppm_max', 'daily_ppm_min',
-            'daily_cpm_sum', 'daily_cpm_max', 'daily_cpm_min', 'daily_cpm_mean']
-
-        df = pd.merge(df, df_hourly, on=['date', 'hour'], how='left')
-        df = pd.merge(df, df_day_part_3hr, on=['date', 'day_part_3hr'], how='left')
-        df = pd.merge(df, df_day_part_6hr, on=['date', 'day_part_6hr'], how='left')
-        df = pd.merge(df, df_daily, on=['date'], how='left')
-
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.dropna()
-        return df
+        df.index = pd.RangeIndex(len(df))
+
+        cube = self.time_cube(df)
+        bound_levels = {
+            'hourly_': 'hour',
+            '3h_partly_': '3h',
+            '6h_partly_': '6h',
+            'daily_': 'day',
+        }
+        for prefix, level in bound_levels.items():
+            for stat in ['mean', 'max', 'min']:
+                df[f'{prefix}ppm_{stat}'] = cube.broadcast(level, 'price_per_mile', stat, self.float_dtype)
+            for stat in ['sum', 'max', 'min', 'mean']:
+                df[f'{prefix}cpm_{stat}'] = cube.broadcast(level, 'count_per_mile', stat, self.float_dtype)
+        return self.validity.dropna(df)
 
     def build_ratios(self, df):
-        for col in ['hourly_', '3h_partly_', '6h_partly_', 'daily_']:
+        prefixes = ['hourly_', '3h_partly_', '6h_partly_', 'daily_']
+        for col in prefixes:
             df[col + 'ppm_max_ratio'] = df['price_per_mile'] / df[col + 'ppm_max']
             df[col + 'ppm_min_ratio'] = df[col + 'ppm_min'] / df['price_per_mile']
             df[col + 'cpm_max_ratio'] = df['count_per_mile'] / df[col + 'cpm_max']
@@ -179,49 +141,37 @@ class BuildAnalysisFeatures:
             df[col + 'cpm_sum_ratio'] = df['count_per_mile'] / df[col + 'cpm_sum']
             df[col + 'cpm_mean_ratio'] = df['count_per_mile'] / df[col + 'cpm_mean']
 
-            df[col + 'ppm_max_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'ppm_max_ratio']])
-            df[col + 'ppm_min_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'ppm_min_ratio']])
-            df[col + 'cpm_max_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'cpm_max_ratio']])
-            df[col + 'cpm_min_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'cpm_min_ratio']])
-            df[col + 'cpm_sum_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'cpm_sum_ratio']])
-            df[col + 'cpm_mean_ratio_scaled'] = self.scaler.fit_transform(df[[col + 'cpm_mean_ratio']])
+        ratio_cols = [
+            col + ratio for col in prefixes
+            for ratio in ['ppm_max_ratio', 'ppm_min_ratio', 'cpm_max_ratio', 'cpm_min_ratio', 'cpm_sum_ratio', 'cpm_mean_ratio']]
+        df = self.scale(df, ratio_cols)
+        return self.validity.dropna(df)
 
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.dropna()
-        return df
-
-    def build_moving_averages(self, df, window=6):
+    def build_moving_averages(self, df):
+        """Time-based (``rolling_window`` over ``timestamp``) means, optionally restarted per ``rolling_by`` group"""
         cols = [col for col in df.columns if '3h_partly' in col or '6h_partly' in col]
-        for col in cols:
-            df[col + '_rolling'] = df[col].rolling(window=window).mean()
-        return df
+        window = RollingWindow(df, self.dc.rolling_window, by=self.dc.rolling_by)
+        return window.apply(df, cols, 'mean', mask=self.validity.get(df))
 
     def build_price_features(self, df):
-        df['ppm_scaled'] = self.scaler.fit_transform(df[['price_per_mile']])
-        df['expensive_trip'] = (df['price_per_mile'] > df['price_per_mile'].quantile(0.95)).astype(int)
-        df['cheap_trip'] = (df['price_per_mile'] < df['price_per_mile'].quantile(0.05)).astype(int)
-        df = df.replace([np.inf, -np.inf], np.nan)
-        return df
+        df = self.scale(df, ['price_per_mile'])
+        df['ppm_scaled'] = df.pop('price_per_mile_scaled')
+        low, high = quantiles(self.validity.values(df, 'price_per_mile'), [0.05, 0.95], self.dc.quantile_sketch_k)
+        df['expensive_trip'] = (df['price_per_mile'] > high).astype(int)
+        df['cheap_trip'] = (df['price_per_mile'] < low).astype(int)
+        return self.validity.replace_inf(df)
 
     def build_distance_features(self, df):
-        df['distance_scaled'] = self.scaler.fit_transform(df[['distance']])
-        df['long_trip'] = (df['distance'] > df['distance'].quantile(0.95)).astype(int)
-        df['short_trip'] = (df['distance'] < df['distance'].quantile(0.05)).astype(int)
-        df = df.replace([np.inf, -np.inf], np.nan)
-        return df
+        df = self.scale(df, ['distance'])
+        low, high = quantiles(self.validity.values(df, 'distance'), [0.05, 0.95], self.dc.quantile_sketch_k)
+        df['long_trip'] = (df['distance'] > high).astype(int)
+        df['short_trip'] = (df['distance'] < low).astype(int)
+        return self.validity.replace_inf(df)
 
     def build_lagged_features(self, df):
-        for lag in self.dc.lag_windows:
-            df[f'ppm_lag_{lag}'] = df.groupby('date')['price_per_mile'].shift(lag).ffill()
-            df[f'cpm_lag_{lag}'] = df.groupby('date')['count_per_mile'].shift(lag).ffill()
-        return df
-
-    def round_and_optimize_df(self, df):
-        float_cols = df.select_dtypes(include=['float32', 'float64']).columns
-        df[float_cols] = df[float_cols].round(4)
-        int_cols = df.select_dtypes(include=['int64']).columns
-        df[int_cols] = df[int_cols].astype('int32')
-        return df
+        """Per-date lags of price/count per mile, forward filled over the row order"""
+        lags = GroupedLags(df, 'date', mask=self.validity.get(df))
+        return lags.apply(df, {'price_per_mile': 'ppm', 'count_per_mile': 'cpm'}, self.dc.lag_windows)
 
     # def save_summary_stats(self, df):
     #     summary_stats = df.groupby(['hour', 'dow_num']).agg({
@@ -1,137 +1,122 @@
 from __future__ import annotations
 
-import numpy as np
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-
-from utils.execution import TaskExecutor
+from typing import Optional
 
+import pandas as pd
 
-class BuildModelFeatures:
+from config.state_init import StateManager
+from src.features.calendar import CalendarDimension
+from src.features.memory import MemoryReport
+from src.features.parallel import ParallelDateExecutor
+from src.features.partitions import DatePartitionStore
+from src.features.rolling import RollingWindow
+from src.features.scaling import FeatureScaler
+from src.features.trip_features import TripFeatureSteps
+from src.features.validity import ValidityMask
+from src.features.zones import ZoneDemand
+from src.features.zones import ZoneGrid
+from utils.feature_cache import FeatureCache
+
+
+class BuildModelFeatures(TripFeatureSteps):
     """Build only features required by model (instead of buidling extenive list of features and selecting)"""
 
-    def __init__(self):
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+    def __init__(self, state: StateManager, cache: Optional[FeatureCache] = None):
+        self.dc = state.data_config
+        self.mc = state.model_config
+        self.scaler_path = state.paths.get_path('scalers') / 'model_features.json'
+        self.scaler = FeatureScaler() if self.dc.fit_scalers else FeatureScaler.load(self.scaler_path)
+        self.calendar = CalendarDimension(self.mc, low_memory=self.dc.low_memory)
+        self.zones = ZoneGrid.from_config(self.mc)
+        self.float_dtype = 'float32' if self.dc.low_memory else 'float64'
+        self.memory = MemoryReport(type(self).__name__) if self.dc.low_memory else None
+        self.validity = ValidityMask(type(self).__name__, enabled=self.dc.validity_mask, checkpoints=self.dc.compact_after)
+        self.cache = cache
+        # Everything the global steps start from; resuming later would skip the scaler fits
+        self.cube = None
+        self.cube_columns = ('count_per_mile',)
+        self.cached_steps = ['build_zone_features']
+        self.executor = None
+        if self.dc.parallel_features and self.dc.n_workers > 1:
+            self.executor = ParallelDateExecutor(self.dc.n_workers)
+        self.partitions = None
+        if self.dc.incremental:
+            self.partitions = DatePartitionStore(
+                state.paths.get_path('partitions') / 'model_features', salt=repr((self.dc, self.mc)), executor=self.executor)
 
     def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
-        steps = [
+        # Date-local steps: every aggregate is keyed by date, so each date can be built on its own
+        partition_steps = [
+            self.build_low_memory_dtypes,
             self.build_dt_features,
             self.build_haversine_distance,
             self.build_price_per_mile,
             self.build_count_per_mile,
             self.build_demand_features,
             self.build_bound_features,
+            self.build_zone_features,
+        ]
+        # Global steps (the reduce phase when parallel): scalers fit and rolling windows run over the whole row order
+        global_steps = [
             self.build_ratios,
             self.build_scales,
             self.build_moving_averages,
             self.round_and_optimize_df
         ]
-        for step in steps:
-            df = TaskExecutor.run_child_step(step, df)
-        return df
-
-    def build_dt_features(self, df):
-        df['date'] = df['timestamp'].dt.date.astype('datetime64[ns]')
-        df['hour'] = df['timestamp'].dt.hour.astype('int32')
-        df['dow_num'] = df['timestamp'].dt.dayofweek
-        df['is_weekend'] = df['dow_num'].isin([5, 6]).astype(int)
-        df['week'] = df['timestamp'].dt.isocalendar().week.astype('UInt32')
-        df['date_hour'] = df['timestamp'].dt.strftime('%Y-%m-%d %H').astype('datetime64[ns]')
-        df['day_part_3hr'] = pd.cut(
-            df['hour'], bins=[-1, 3, 6, 9, 12, 15, 18, 21, 23],
-            labels=['Night', 'Early Morning', 'Morning', 'Early Afternoon', 'Afternoon', 'Early Evening', 'Evening', 'Early Night'])
-        return df
-
-    def calc_haversine_distance(self, lat1, lon1, lat2, lon2):
-        R = 3959  # Earth radius in miles
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        return R * c
-
-    def build_haversine_distance(self, df):
-        df['distance'] = self.calc_haversine_distance(
-            df['pickup_latitude'], df['pickup_longitude'],
-            df['dropoff_latitude'], df['dropoff_longitude'])
-        return df
-
-    def build_price_per_mile(self, df):
-        df['price_per_mile'] = df['price'] / df['distance']
-        df = df[(df['price_per_mile'] > 0) & (df['price_per_mile'] < 100)]
-        return df
-
-    def build_count_per_mile(self, df):
-        df['count_per_mile'] = df['count'] / df['distance']
-        df = df[(df['count_per_mile'] > 0) & (df['count_per_mile'] < 100)]
-        return df
+        if self.partitions is not None or self.executor is not None:
+            # Date partitions are concatenated afterwards, so each is compacted where it is built
+            partition_steps.append(self.compact_valid_rows)
+        if self.partitions is not None:
+            df = self.partitions.run(partition_steps, df)
+            return self.run_steps(global_steps, self.record_memory('date-local steps', df))
+        if self.executor is not None:
+            df = self.executor.run(partition_steps, df)
+            return self.run_steps(global_steps, self.record_memory('date-local steps', df))
+        return self.run_steps(partition_steps + global_steps, df)
 
     def build_demand_features(self, df):
-        # Hourly demand
-        hourly_demand = df.groupby(['date', 'hour'])['count_per_mile'].sum().reset_index()
-        hourly_demand = hourly_demand.groupby(['date', 'hour'])['count_per_mile'].mean().reset_index()
-        hourly_demand.columns = ['date', 'hour', 'avg_hourly_demand']
-
-        # Day part demand
-        day_part_3hr_demand = df.groupby(['date', 'day_part_3hr'])['count_per_mile'].sum().reset_index()
-        day_part_3hr_demand = day_part_3hr_demand.groupby(['date', 'day_part_3hr'])['count_per_mile'].mean().reset_index()
-        day_part_3hr_demand.columns = ['date', 'day_part_3hr', 'avg_day_part_3hr_demand']
-
-        # Daily demand
-        daily_demand = df.groupby(['date', 'dow_num'])['count_per_mile'].sum().reset_index()
-        daily_demand = daily_demand.groupby(['date', 'dow_num'])['count_per_mile'].mean().reset_index()
-        daily_demand.columns = ['date', 'dow_num', 'avg_daily_demand']
-
-        # Merge features back to the original dataframe
-        df = pd.merge(df, hourly_demand, on=['date', 'hour'], how='left')
-        df = pd.merge(df, day_part_3hr_demand, on=['date', 'day_part_3hr'], how='left')
-        df = pd.merge(df, daily_demand, on=['date', 'dow_num'], how='left')
-
-        # Forward fill to ensure each hour has a value
-        df = df.sort_values(['date', 'hour'])
-        df['avg_day_part_3hr_demand'] = df.groupby('date')['avg_day_part_3hr_demand'].ffill()
-        df['avg_daily_demand'] = df.groupby('date')['avg_daily_demand'].ffill()
-        return df
+        df.index = pd.RangeIndex(len(df))
+        cube = self.time_cube(df)
+        demand_levels = {
+            'avg_hourly_demand': 'hour',
+            'avg_day_part_3hr_demand': '3h',
+            'avg_daily_demand': 'day',
+        }
+        for col, level in demand_levels.items():
+            df[col] = cube.broadcast(level, 'count_per_mile', 'sum', self.float_dtype)
+
+        # Rows must be in (date, hour) order
+        return self.sort_by_hour(df)
 
     def build_bound_features(self, df):
-        df_day_part_3hr = df.groupby(['date', 'day_part_3hr']).agg({
-            'count_per_mile': ['sum', 'max', 'min', 'mean']
-        }).reset_index()
-        df_day_part_3hr.columns = [
-            'date', 'day_part_3hr',
-            '3h_partly_cpm_sum', '3h_partly_cpm_max', '3h_partly_cpm_min', '3h_partly_cpm_mean']
-        df = pd.merge(df, df_day_part_3hr, on=['date', 'day_part_3hr'], how='left')
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.dropna()
+        df.index = pd.RangeIndex(len(df))
+        cube = self.time_cube(df)
+        for stat in ['sum', 'max', 'min', 'mean']:
+            df[f'3h_partly_cpm_{stat}'] = cube.broadcast('3h', 'count_per_mile', stat, self.float_dtype)
+        return self.validity.dropna(df)
+
+    def build_zone_features(self, df):
+        """Trip demand relative to its pickup zone's (date, 3h day part) slot, for localized surge"""
+        df['pickup_zone'] = self.zones.zone(df['pickup_latitude'], df['pickup_longitude'])
+        demand = ZoneDemand(df, self.zones, mask=self.validity.get(df))
+        for stat in ['mean', 'max']:
+            df[f'zone_3h_cpm_{stat}'] = demand.broadcast(stat).astype(self.float_dtype)
+        df['zone_3h_cpm_mean_ratio'] = df['count_per_mile'] / df['zone_3h_cpm_mean']
+        df['zone_3h_cpm_max_ratio'] = df['count_per_mile'] / df['zone_3h_cpm_max']
         return df
 
     def build_ratios(self, df):
         df['3h_partly_cpm_max_ratio'] = df['count_per_mile'] / df['3h_partly_cpm_max']
         df['3h_partly_cpm_min_ratio'] = df['3h_partly_cpm_min'] / df['count_per_mile']
         df['3h_partly_cpm_mean_ratio'] = df['count_per_mile'] / df['3h_partly_cpm_mean']
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.dropna()
-        return df
+        return self.validity.dropna(df)
 
     def build_scales(self, df):
-        df['3h_partly_cpm_max_ratio_scaled'] = self.scaler.fit_transform(df[['3h_partly_cpm_max_ratio']])
-        df['3h_partly_cpm_min_ratio_scaled'] = self.scaler.fit_transform(df[['3h_partly_cpm_min_ratio']])
-        df['3h_partly_cpm_mean_ratio_scaled'] = self.scaler.fit_transform(df[['3h_partly_cpm_mean_ratio']])
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.dropna()
-        return df
+        df = self.scale(df, ['3h_partly_cpm_max_ratio', '3h_partly_cpm_min_ratio', '3h_partly_cpm_mean_ratio'])
+        return self.validity.dropna(df)
 
-    def build_moving_averages(self, df, window=6):
+    def build_moving_averages(self, df):
+        """Time-based (``rolling_window`` over ``timestamp``) means, optionally restarted per ``rolling_by`` group"""
         cols = [col for col in df.columns if '3h_partly_cpm_mean_ratio' in col]
-        for col in cols:
-            df[col + '_rolling'] = df[col].rolling(window=window).mean()
-        return df
-
-    def round_and_optimize_df(self, df):
-        float_cols = df.select_dtypes(include=['float32', 'float64']).columns
-        df[float_cols] = df[float_cols].round(4)
-        int_cols = df.select_dtypes(include=['int64']).columns
-        df[int_cols] = df[int_cols].astype('int32')
-        return df
+        window = RollingWindow(df, self.dc.rolling_window, by=self.dc.rolling_by)
+        return window.apply(df, cols, 'mean', mask=self.validity.get(df))
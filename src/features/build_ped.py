@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from config.state_init import StateManager
+from utils.execution import TaskExecutor
+
+
+class BuildPED:
+    """Estimate price elasticity of demand (log-log slope of count_per_mile on price_per_mile)"""
+
+    def __init__(self, state: StateManager):
+        self.dc = state.data_config
+        self.mc = state.model_config
+
+    def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        steps = [
+            self.build_cell_stats,
+            self.estimate_elasticities,
+        ]
+        for step in steps:
+            df = TaskExecutor.run_child_step(step, df)
+        logging.info(f"PED estimates:\n{df[df['dimension'] != 'hour_of_week']}")
+        return df
+
+    def build_cell_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Regression sufficient statistics per (day part, hour-of-week, distance band) cell.
+
+        One bincount pass per statistic over the trips; every grouping below is a roll-up of these
+        few thousand cells, so the row count only matters here.
+        """
+        valid = (df['price_per_mile'] > 0) & (df['count_per_mile'] > 0)
+        df = df[valid]
+        x = np.log(df['price_per_mile'].to_numpy(dtype='float64'))
+        y = np.log(df['count_per_mile'].to_numpy(dtype='float64'))
+        # Centre on the global means to keep the normal equations well conditioned
+        x_mean, y_mean = x.mean(), y.mean()
+        x -= x_mean
+        y -= y_mean
+
+        day_part = pd.Categorical(df['day_part_3hr'], categories=list(self.mc.time_periods_3hr))
+        hour_of_week = df['dow_num'].to_numpy(dtype='int64') * 24 + df['hour'].to_numpy(dtype='int64')
+        band = pd.cut(df['distance'], bins=self.dc.distance_bands, right=False)
+        band_labels = [str(interval) for interval in band.cat.categories]
+
+        n_parts, n_bands = len(day_part.categories) + 1, len(band_labels) + 1
+        part_codes = np.where(day_part.codes < 0, n_parts - 1, day_part.codes).astype('int64')
+        band_codes = np.where(band.cat.codes < 0, n_bands - 1, band.cat.codes).astype('int64')
+        cell = (part_codes * 168 + hour_of_week) * n_bands + band_codes
+        n_cells = n_parts * 168 * n_bands
+
+        stats = {
+            'n': np.bincount(cell, minlength=n_cells).astype('float64'),
+            'sx': np.bincount(cell, weights=x, minlength=n_cells),
+            'sy': np.bincount(cell, weights=y, minlength=n_cells),
+            'sxx': np.bincount(cell, weights=x * x, minlength=n_cells),
+            'sxy': np.bincount(cell, weights=x * y, minlength=n_cells),
+            'syy': np.bincount(cell, weights=y * y, minlength=n_cells),
+        }
+        cells = pd.DataFrame(stats)
+        cells['day_part_3hr'] = np.repeat(list(day_part.categories) + ['Unknown'], 168 * n_bands)
+        cells['hour_of_week'] = np.tile(np.repeat(np.arange(168), n_bands), n_parts)
+        cells['distance_band'] = np.tile(band_labels + ['Unknown'], n_parts * 168)
+        cells = cells[cells['n'] > 0].reset_index(drop=True)
+        cells.attrs['x_mean'], cells.attrs['y_mean'] = x_mean, y_mean
+        return cells
+
+    def estimate_elasticities(self, cells: pd.DataFrame) -> pd.DataFrame:
+        groupings = {
+            'all': np.zeros(len(cells), dtype='int64'),
+            'day_part_3hr': cells['day_part_3hr'],
+            'hour_of_week': cells['hour_of_week'],
+            'distance_band': cells['distance_band'],
+        }
+        frames = []
+        for dimension, keys in groupings.items():
+            grouped = cells.groupby(keys, sort=False)[['n', 'sx', 'sy', 'sxx', 'sxy', 'syy']].sum()
+            table = self.solve_normal_equations(grouped, cells.attrs['x_mean'], cells.attrs['y_mean'])
+            table.insert(0, 'dimension', dimension)
+            table.insert(1, 'group', grouped.index.astype(str) if dimension != 'all' else 'all')
+            frames.append(table)
+        return pd.concat(frames, ignore_index=True)
+
+    def solve_normal_equations(self, stats: pd.DataFrame, x_mean: float, y_mean: float) -> pd.DataFrame:
+        """Solve every group's 2x2 system ``[[n, sx], [sx, sxx]] @ [a, b] = [sy, sxy]`` in one batch."""
+        n, sx, sy, sxx, sxy, syy = (stats[c].to_numpy() for c in ['n', 'sx', 'sy', 'sxx', 'sxy', 'syy'])
+        lhs = np.stack([np.stack([n, sx], axis=-1), np.stack([sx, sxx], axis=-1)], axis=-2)
+        rhs = np.stack([sy, sxy], axis=-1)
+        det = n * sxx - sx * sx
+
+        solvable = (n >= self.dc.ped_min_obs) & (det > 1e-12 * np.maximum(n * sxx, 1.0))
+        coef = np.full((len(n), 2), np.nan)
+        if solvable.any():
+            coef[solvable] = np.linalg.solve(lhs[solvable], rhs[solvable][..., None])[..., 0]
+        intercept, slope = coef[:, 0], coef[:, 1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sse = np.maximum(syy - intercept * sy - slope * sxy, 0.0)
+            sst = syy - sy * sy / n
+            std_error = np.sqrt(sse / (n - 2) * n / det)
+            r_squared = 1 - sse / sst
+
+        return pd.DataFrame({
+            'n_obs': n.astype('int64'),
+            'elasticity': slope,
+            'intercept': intercept + y_mean - slope * x_mean,
+            'std_error': np.where(solvable, std_error, np.nan),
+            'r_squared': np.where(solvable, r_squared, np.nan),
+        })
+
+    @staticmethod
+    def elasticity_map(table: pd.DataFrame, dimension: str = 'day_part_3hr') -> Dict[str, float]:
+        """Lookup of ``group -> elasticity`` for one dimension of a PED table, for pricing/reporting."""
+        rows = table[(table['dimension'] == dimension) & table['elasticity'].notna()]
+        return dict(zip(rows['group'], rows['elasticity']))
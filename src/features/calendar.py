@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+
+DOW_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+CALENDAR_COLUMNS = ['date', 'hour', 'dow_num', 'is_weekend', 'week', 'date_hour', 'month', 'dow', 'day_part_3hr', 'day_part_6hr']
+
+
+class CalendarDimension:
+    """Calendar attributes per distinct floored hour, gathered onto trips by integer index.
+
+    A year has ~8,760 distinct hours, so the datetime work (``strftime``-style flooring, ``isocalendar``,
+    ``day_name``, day part binning) runs on the small table instead of on every trip row.
+    """
+
+    def __init__(self, mc: ModelConfig, low_memory: bool = False):
+        self.low_memory = low_memory
+        self.day_parts = {'day_part_3hr': mc.hour_day_parts(3), 'day_part_6hr': mc.hour_day_parts(6)}
+        self.categories = {'day_part_3hr': list(mc.time_periods_3hr), 'day_part_6hr': list(mc.time_periods_6hr)}
+
+    @staticmethod
+    def hour_codes(timestamps: pd.Series) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+        """Row index into the calendar table and the table's floored hours (timestamps must be non-null)."""
+        hours = timestamps.to_numpy(dtype='datetime64[ns]').astype('datetime64[h]').astype('int64')
+        if len(hours) == 0:
+            return np.array([], dtype='int64'), pd.DatetimeIndex([], dtype='datetime64[ns]')
+        first, last = hours.min(), hours.max()
+        if last - first < len(hours):
+            # Dense hour range: the offset from the first hour is the table row
+            codes = hours - first
+            table_hours = np.arange(first, last + 1)
+        else:
+            table_hours, codes = np.unique(hours, return_inverse=True)
+        return codes, pd.DatetimeIndex(table_hours.astype('datetime64[h]').astype('datetime64[ns]'))
+
+    def build(self, hours: pd.DatetimeIndex) -> pd.DataFrame:
+        hour = hours.hour.to_numpy().astype('int32')
+        dow_num = hours.dayofweek.to_numpy()
+        table = pd.DataFrame({
+            'date': hours.normalize(),
+            'hour': hour,
+            'dow_num': dow_num,
+            'is_weekend': np.isin(dow_num, [5, 6]).astype(int),
+            'week': hours.isocalendar()['week'].astype('UInt32').array,
+            'date_hour': hours,
+            'month': hours.month.to_numpy().astype('int32'),
+            'dow': hours.day_name().str[:3],
+        })
+        if self.low_memory:
+            table['dow'] = pd.Categorical(table['dow'], categories=DOW_LABELS)
+        for name, labels in self.day_parts.items():
+            table[name] = pd.Categorical(np.array(labels)[hour], categories=self.categories[name], ordered=True)
+        return table
+
+    def attach(self, df: pd.DataFrame, columns: List[str] = CALENDAR_COLUMNS) -> pd.DataFrame:
+        """Add calendar ``columns`` to the trips in ``df`` from their ``timestamp``."""
+        codes, hours = self.hour_codes(df['timestamp'])
+        table = self.build(hours)
+        logging.debug(f"Calendar dimension: {len(table)} hours for {len(df)} trips")
+        for col in columns:
+            df[col] = table[col].array.take(codes)
+        return df
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+DISTANCE_METHODS = ['haversine', 'equirectangular']
+
+
+def _prepare(lat1, lon1, lat2, lon2, out: Optional[np.ndarray], dtype: str):
+    coords = [np.asarray(values) for values in (lat1, lon1, lat2, lon2)]
+    if out is None:
+        out = np.empty(len(coords[0]), dtype=dtype)
+    return coords, out
+
+
+def haversine(lat1, lon1, lat2, lon2, out: Optional[np.ndarray] = None, dtype: str = 'float64', chunk_size: int = 65536) -> np.ndarray:
+    """Great-circle distance in miles between coordinate arrays (degrees).
+
+    Works through the rows in ``chunk_size`` blocks with two scratch buffers reused for every block, and
+    every ufunc writes in place, so the only full-length allocation is ``out``.
+    """
+    (lat1, lon1, lat2, lon2), out = _prepare(lat1, lon1, lat2, lon2, out, dtype)
+    half_rad = np.pi / 360
+    scratch_a = np.empty(min(chunk_size, len(out)), dtype=out.dtype)
+    scratch_b = np.empty_like(scratch_a)
+    for start in range(0, len(out), chunk_size):
+        end = min(start + chunk_size, len(out))
+        a, b, o = scratch_a[:end - start], scratch_b[:end - start], out[start:end]
+        # sin^2(dlat / 2)
+        np.subtract(lat2[start:end], lat1[start:end], out=o, casting='same_kind')
+        o *= half_rad
+        np.sin(o, out=o)
+        np.square(o, out=o)
+        # cos(lat1) * cos(lat2)
+        np.multiply(lat1[start:end], 2 * half_rad, out=a, casting='same_kind')
+        np.cos(a, out=a)
+        np.multiply(lat2[start:end], 2 * half_rad, out=b, casting='same_kind')
+        np.cos(b, out=b)
+        a *= b
+        # * sin^2(dlon / 2)
+        np.subtract(lon2[start:end], lon1[start:end], out=b, casting='same_kind')
+        b *= half_rad
+        np.sin(b, out=b)
+        np.square(b, out=b)
+        a *= b
+        o += a
+        # 2R * arcsin(sqrt(a)), clipped against rounding just above 1
+        np.sqrt(o, out=o)
+        np.minimum(o, 1, out=o)
+        np.arcsin(o, out=o)
+        o *= 2 * EARTH_RADIUS_MILES
+    return out
+
+
+def equirectangular(lat1, lon1, lat2, lon2, out: Optional[np.ndarray] = None, dtype: str = 'float64', chunk_size: int = 65536) -> np.ndarray:
+    """Flat-earth approximation of ``haversine`` with longitude scaled by the cosine of the mean latitude.
+
+    No inverse trig and one cosine per row. Within a city (trips up to ~50 miles, latitudes below ~60°)
+    the relative error against ``haversine`` stays under 0.01%.
+    """
+    (lat1, lon1, lat2, lon2), out = _prepare(lat1, lon1, lat2, lon2, out, dtype)
+    rad = np.pi / 180
+    scratch = np.empty(min(chunk_size, len(out)), dtype=out.dtype)
+    for start in range(0, len(out), chunk_size):
+        end = min(start + chunk_size, len(out))
+        x, o = scratch[:end - start], out[start:end]
+        # x = dlon * cos(mean lat)
+        np.add(lat1[start:end], lat2[start:end], out=o, casting='same_kind')
+        o *= rad / 2
+        np.cos(o, out=o)
+        np.subtract(lon2[start:end], lon1[start:end], out=x, casting='same_kind')
+        x *= o
+        np.square(x, out=x)
+        # y = dlat
+        np.subtract(lat2[start:end], lat1[start:end], out=o, casting='same_kind')
+        np.square(o, out=o)
+        o += x
+        np.sqrt(o, out=o)
+        o *= rad * EARTH_RADIUS_MILES
+    return out
+
+
+def distance(lat1, lon1, lat2, lon2, method: str = 'haversine', dtype: str = 'float64') -> np.ndarray:
+    """Trip distance in miles with one of ``DISTANCE_METHODS``."""
+    if method == 'haversine':
+        return haversine(lat1, lon1, lat2, lon2, dtype=dtype)
+    if method == 'equirectangular':
+        return equirectangular(lat1, lon1, lat2, lon2, dtype=dtype)
+    raise ValueError(f'Unknown distance method: {method}, expected one of {DISTANCE_METHODS}')
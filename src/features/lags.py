@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.features.aggregation import encode_column
+
+
+class GroupedLags:
+    """Lagged copies of several columns within groups, for many lags in one preallocated block.
+
+    Rows are ordered by group once and every row's position inside its group is kept, so each lag is a
+    single gather: ``shift(lag)`` within the group, NaN where the lag runs past the group's edge (or the
+    key is missing). Equivalent to ``df.groupby(by)[col].shift(lag)`` for every column and lag.
+    """
+
+    def __init__(self, df: pd.DataFrame, by: str, mask: Optional[np.ndarray] = None):
+        codes, _ = encode_column(df[by])
+        if mask is not None:
+            # Masked rows get the missing key: no lags of their own, and they take no position in a group
+            codes = np.where(mask, codes, -1)
+        order = np.argsort(codes, kind='stable')
+        self.order = None if np.all(order[1:] > order[:-1]) else order
+        sorted_codes = codes if self.order is None else codes[self.order]
+
+        n_rows = len(codes)
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if n_rows else np.array([], dtype='int64')
+        sizes = np.diff(np.r_[starts, n_rows])
+        self.rows = np.arange(n_rows)
+        self.position = self.rows - np.repeat(starts, sizes)
+        self.size = np.repeat(sizes, sizes)
+        self.missing = sorted_codes < 0
+
+    def shift(self, values: np.ndarray, lags: List[int]) -> np.ndarray:
+        """``(n_rows, len(lags) * n_columns)`` block, lag-major: all columns at lags[0], then lags[1], ..."""
+        values = np.asarray(values)
+        values = values.astype(np.result_type(values.dtype, np.float32), copy=False)
+        if self.order is not None:
+            values = values[self.order]
+        n_columns = values.shape[1]
+        block = np.full((len(self.rows), len(lags) * n_columns), np.nan, dtype=values.dtype)
+        for i, lag in enumerate(lags):
+            source = self.position - lag
+            valid = (source >= 0) & (source < self.size) & ~self.missing
+            block[valid, i * n_columns:(i + 1) * n_columns] = values[self.rows[valid] - lag]
+        if self.order is not None:
+            unsorted = np.empty_like(block)
+            unsorted[self.order] = block
+            block = unsorted
+        return block
+
+    @staticmethod
+    def ffill(block: np.ndarray) -> np.ndarray:
+        """Forward fill down the rows of every column, as ``DataFrame.ffill`` does."""
+        last_valid = np.where(np.isnan(block), 0, np.arange(len(block))[:, None])
+        np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+        return np.take_along_axis(block, last_valid, axis=0)
+
+    def apply(self, df: pd.DataFrame, columns: Dict[str, str], lags: List[int], ffill: bool = True) -> pd.DataFrame:
+        """Add ``<prefix>_lag_<lag>`` for each ``{column: prefix}`` and lag, forward filled over the frame's row order."""
+        block = self.shift(df[list(columns)].to_numpy(), lags)
+        if ffill:
+            block = self.ffill(block)
+        names = [f'{prefix}_lag_{lag}' for lag in lags for prefix in columns.values()]
+        for i, name in enumerate(names):
+            df[name] = block[:, i]
+        return df
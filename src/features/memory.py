@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+import sys
+import tracemalloc
+from functools import wraps
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Repeated labels that default mode keeps as object strings (``time_zone`` is categorical already when read through the raw schema)
+CATEGORICAL_COLUMNS = ['dow', 'time_zone']
+
+
+def to_low_memory(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """float64 -> float32 and repeated string labels -> categoricals, column by column (all, or just ``columns``)."""
+    for col in df.columns if columns is None else columns:
+        if df[col].dtype == 'float64':
+            df[col] = df[col].astype('float32')
+        elif col in CATEGORICAL_COLUMNS and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def column_bytes(values: pd.Series) -> int:
+    return int(values.memory_usage(index=False, deep=True))
+
+
+def default_column_bytes(col: str, values: pd.Series) -> int:
+    """Size the column would have with default-mode dtypes (float64, object labels)."""
+    if values.dtype == 'float32':
+        return 2 * values.nbytes
+    if col in CATEGORICAL_COLUMNS and isinstance(values.dtype, pd.CategoricalDtype):
+        # Object column: one pointer per row plus every row's string object, as memory_usage(deep=True) counts it
+        sizes = np.array([sys.getsizeof(label) for label in values.cat.categories], dtype='int64')
+        codes = values.cat.codes.to_numpy()
+        return 8 * len(values) + int(np.bincount(codes[codes >= 0], minlength=len(sizes)) @ sizes)
+    return column_bytes(values)
+
+
+def default_frame_bytes(df: pd.DataFrame) -> int:
+    """Size the same frame would have with default-mode dtypes (float64, object labels)."""
+    return int(df.index.memory_usage(deep=True)) + sum(default_column_bytes(col, df[col]) for col in df.columns)
+
+
+class MemoryReport:
+    """Frame size after each builder step in low-memory mode, against the default-mode dtypes, and the
+    peak memory each step allocated on the way.
+
+    The peak is traced with ``tracemalloc`` (numpy and pandas buffers included) above what was allocated
+    when the step started, so it counts the step's temporaries as well as the columns it adds. Column
+    sizes are measured once per column, dtype and row count; later steps reuse them.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.steps: List[Tuple[str, int, int, float]] = []
+        self.column_sizes: Dict[Tuple[str, str, int], Tuple[int, int]] = {}
+
+    def size(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int]:
+        """Downcast the columns not sized yet and return the frame with its low-memory and default-mode bytes."""
+        def key(col):
+            return col, str(df[col].dtype), len(df)
+        new = [col for col in df.columns if key(col) not in self.column_sizes]
+        df = to_low_memory(df, new)
+        for col in new:
+            self.column_sizes[key(col)] = (column_bytes(df[col]), default_column_bytes(col, df[col]))
+        index = int(df.index.memory_usage(deep=True))
+        sizes = [self.column_sizes[key(col)] for col in df.columns]
+        return df, index + sum(actual for actual, _ in sizes), index + sum(default for _, default in sizes)
+
+    def record(self, step_name: str, df: pd.DataFrame, peak: Optional[int] = None) -> pd.DataFrame:
+        """Downcast anything a step left at default width, then log the frame size and the step's peak."""
+        df, actual, default = self.size(df)
+        self.steps.append((step_name, actual, default, np.nan if peak is None else peak))
+        peak_note = '' if peak is None else f", {peak / 1024**2:.1f} MB peak"
+        logging.debug(f"{self.name}.{step_name}: {actual / 1024**2:.1f} MB ({(default - actual) / 1024**2:.1f} MB saved{peak_note})")
+        return df
+
+    def track(self, step: Callable) -> Callable:
+        @wraps(step)
+        def wrapper(df: pd.DataFrame) -> pd.DataFrame:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            try:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                df = step(df)
+                peak = tracemalloc.get_traced_memory()[1] - base
+            finally:
+                if started:
+                    tracemalloc.stop()
+            return self.record(step.__name__, df, peak)
+        return wrapper
+
+    def summary(self) -> pd.DataFrame:
+        report = pd.DataFrame(self.steps, columns=['step', 'bytes', 'default_bytes', 'peak_bytes'])
+        report['saved_mb'] = (report['default_bytes'] - report['bytes']) / 1024**2
+        report['peak_mb'] = report['peak_bytes'] / 1024**2
+        return report
+
+    def log(self):
+        if not self.steps:
+            return
+        report = self.summary()
+        largest = report.loc[report['bytes'].idxmax()]
+        peak_note = ''
+        if report['peak_bytes'].notna().any():
+            peak = report.loc[report['peak_bytes'].idxmax()]
+            peak_note = f", step peak {peak['peak_mb']:.1f} MB in `{peak['step']}`"
+        logging.info(
+            f"{self.name} low-memory frame: largest {largest['bytes'] / 1024**2:.1f} MB after `{largest['step']}` "
+            f"(default dtypes {report['default_bytes'].max() / 1024**2:.1f} MB){peak_note}\n"
+            f"{report[['step', 'saved_mb', 'peak_mb']].round(1).to_string(index=False)}")
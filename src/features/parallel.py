@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from typing import List
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.features.partitions import DatePartitionStore
+from utils.execution import TaskExecutor
+
+_STEPS: Optional[List[Callable]] = None
+
+
+def init_worker(steps: List[Callable]):
+    """Unpickle the builder's steps once per worker process rather than once per shard."""
+    global _STEPS
+    _STEPS = steps
+
+
+def run_partition_steps(part: pd.DataFrame) -> pd.DataFrame:
+    out = part.reset_index(drop=True)
+    for step in _STEPS:
+        out = TaskExecutor.run_child_step(step, out)
+    return out
+
+
+class ParallelDateExecutor:
+    """Map a builder's date-local steps over contiguous date shards in a process pool.
+
+    Shards never split a date, so every date-keyed aggregate sees exactly the rows it would in a
+    full run. Results come back in shard order and are indexed by the rows' positions in the input,
+    the same as ``DatePartitionStore``. Steps that need global statistics (scaler fits, quantile
+    flags, rolling windows across dates) are not run here: the builders run them once over the
+    reassembled frame as the reduce phase.
+    """
+
+    def __init__(self, n_workers: int, shards_per_worker: int = 4):
+        self.n_workers = max(1, n_workers)
+        self.shards_per_worker = shards_per_worker
+
+    def shard_bounds(self, df: pd.DataFrame) -> List[slice]:
+        """Group consecutive dates into about ``n_workers * shards_per_worker`` shards of similar row counts."""
+        bounds = list(DatePartitionStore.date_bounds(df).values())
+        n_shards = min(len(bounds), self.n_workers * self.shards_per_worker)
+        if n_shards == 0:
+            return []
+        ends = np.array([rows.stop for rows in bounds])
+        # Last date of each shard: the first date end reaching each equal share of the rows
+        targets = np.arange(1, n_shards + 1) * (len(df) / n_shards)
+        cuts = np.unique(np.minimum(np.searchsorted(ends, targets), len(ends) - 1))
+        starts = np.r_[0, ends[cuts[:-1]]]
+        return [slice(int(start), int(ends[cut])) for start, cut in zip(starts, cuts)]
+
+    def map(self, steps: List[Callable], parts: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        """Run ``steps`` over each frame in ``parts``, returning outputs in the same order."""
+        if self.n_workers == 1 or len(parts) <= 1:
+            init_worker(steps)
+            return [run_partition_steps(part) for part in parts]
+        with ProcessPoolExecutor(max_workers=min(self.n_workers, len(parts)), initializer=init_worker, initargs=(steps,)) as executor:
+            return list(executor.map(run_partition_steps, parts))
+
+    def run(self, steps: List[Callable], df: pd.DataFrame) -> pd.DataFrame:
+        shards = self.shard_bounds(df)
+        outs = self.map(steps, [df.iloc[rows] for rows in shards])
+        for out, rows in zip(outs, shards):
+            # Shard-local positions -> positions in the full input
+            out.index = out.index + rows.start
+        logging.info(f"Built {len(df)} rows in {len(shards)} date shards on {self.n_workers} workers")
+        return pd.concat(outs) if outs else df.iloc[:0]
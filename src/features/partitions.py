@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from utils.execution import TaskExecutor
+from utils.feature_cache import code_version
+from utils.file_access import FileAccess
+
+if TYPE_CHECKING:
+    from src.features.parallel import ParallelDateExecutor
+
+
+class DatePartitionStore:
+    """Per-date outputs of a builder's date-local steps, recomputed only for new or changed dates.
+
+    Input rows are split into contiguous date partitions (``timestamp`` must be sorted). Each partition
+    is fingerprinted; partitions whose fingerprint matches the manifest are read back from disk, the
+    rest are run through the steps one date at a time (in a process pool when an ``executor`` is
+    given). Each partition's index is offset by its first input row before splicing. Steps that keep row
+    labels therefore leave the frame indexed by input position; after a step that resets the index,
+    such as ``build_demand_features``, the labels are only unique and in date order.
+    """
+
+    def __init__(self, directory: Path, salt: str = '', executor: Optional[ParallelDateExecutor] = None):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / 'manifest.json'
+        self.salt = salt
+        self.executor = executor
+
+    @staticmethod
+    def date_bounds(df: pd.DataFrame) -> Dict[str, slice]:
+        days = df['timestamp'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        if len(days) and np.any(days[1:] < days[:-1]):
+            raise ValueError('Date partitions need trips sorted by timestamp')
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.array([], dtype='int64')
+        ends = np.r_[starts[1:], len(days)]
+        return {str(days[start]): slice(int(start), int(end)) for start, end in zip(starts, ends)}
+
+    def steps_key(self, steps: List[Callable]) -> str:
+        """Step names plus the feature code version, so editing any helper a step calls rebuilds every date"""
+        digest = hashlib.blake2b(digest_size=16)
+        for step in steps:
+            digest.update(f'{step.__module__}.{step.__qualname__}'.encode())
+        digest.update(code_version().encode())
+        digest.update(self.salt.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def read_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        return {'steps': None, 'dates': {}}
+
+    def run(self, steps: List[Callable], df: pd.DataFrame) -> pd.DataFrame:
+        bounds = self.date_bounds(df)
+        manifest = self.read_manifest()
+        steps_key = self.steps_key(steps)
+        known = manifest['dates'] if manifest['steps'] == steps_key else {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        dates, parts, recomputed = {}, {}, {}
+        for date, rows in bounds.items():
+            part = df.iloc[rows]
+            fingerprint = self.fingerprint(part)
+            path = self.directory / f'{date}.parquet'
+            if known.get(date) == fingerprint and path.exists():
+                parts[date] = pd.read_parquet(path)
+            else:
+                recomputed[date] = part
+            dates[date] = fingerprint
+
+        for date, out in zip(recomputed, self.compute(steps, list(recomputed.values()))):
+            out.to_parquet(self.directory / f'{date}.parquet')
+            parts[date] = out
+        for date, rows in bounds.items():
+            # Partition-local positions -> positions in the full input
+            parts[date].index = parts[date].index + rows.start
+
+        for stale in set(manifest['dates']) - set(dates):
+            (self.directory / f'{stale}.parquet').unlink(missing_ok=True)
+        FileAccess.save_json({'steps': steps_key, 'dates': dates}, self.manifest_path, overwrite=True)
+        logging.info(f"Recomputed {len(recomputed)} of {len(bounds)} date partitions in {self.directory}: {list(recomputed)[:10]}")
+        return pd.concat([parts[date] for date in bounds]) if parts else df.iloc[:0]
+
+    def compute(self, steps: List[Callable], parts: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        if self.executor is not None:
+            return self.executor.map(steps, parts)
+        outs = []
+        for part in parts:
+            out = part.reset_index(drop=True)
+            for step in steps:
+                out = TaskExecutor.run_child_step(step, out)
+            outs.append(out)
+        return outs
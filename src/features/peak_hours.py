@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config.state_init import StateManager
+from utils.execution import TaskExecutor
+from utils.feature_cache import code_version
+from utils.file_access import FileAccess
+
+DOW_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# The only features2 columns the hourly cells are aggregated from
+SOURCE_COLUMNS = ['date', 'hour', 'price_per_mile', 'count_per_mile']
+
+
+def top_k_hours(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """Row-wise top-k column indices of a (groups x 24) matrix via partial selection.
+
+    Only the k selected hours are fully sorted (ties broken by hour); empty (NaN) hours rank last.
+    """
+    k = min(k, values.shape[1])
+    keyed = np.where(np.isnan(values), np.inf, -values if largest else values)
+    idx = np.argpartition(keyed, k - 1, axis=1)[:, :k]
+    order = np.lexsort((idx, np.take_along_axis(keyed, idx, axis=1)))
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class PeakHourIndex:
+    """Ranked peak/off-peak hours (``bound_hours.json``), maintained incrementally from hourly aggregates.
+
+    Only ``SOURCE_COLUMNS`` of ``features2`` are read. Like ``DatePartitionStore``, a manifest next to
+    the stored cells records each date's input fingerprint under a key of the aggregation code, so only
+    new or changed dates are re-aggregated, dates gone from the input are dropped, and a code change
+    rebuilds every date.
+    """
+
+    def __init__(self, state: StateManager):
+        self.dc = state.data_config
+        self.source_path = state.paths.get_path('features2')
+        self.hourly_path = state.paths.get_path('hourly_agg')
+        self.manifest_path = self.hourly_path.with_suffix('.json')
+        self.index_path = state.paths.get_path('bound_hours')
+
+    def pipeline(self, df: Optional[pd.DataFrame] = None) -> Dict:
+        if df is None:
+            with FileAccess.load_file(self.source_path, self.dc.date_range, SOURCE_COLUMNS) as source:
+                return self.pipeline(source)
+        steps = [
+            self.update_hourly_aggregates,
+            self.build_index,
+        ]
+        for step in steps:
+            df = TaskExecutor.run_child_step(step, df)
+        FileAccess.save_json(df, self.index_path, self.dc.overwrite)
+        return df
+
+    def aggregate_hours(self, df: pd.DataFrame) -> pd.DataFrame:
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+        key = date_codes * 24 + df['hour'].to_numpy(dtype='int64')
+        n_cells = len(dates) * 24
+        hourly = pd.DataFrame({
+            'date': np.repeat(pd.to_datetime(dates), 24),
+            'hour': np.tile(np.arange(24, dtype='int32'), len(dates)),
+            'n': np.bincount(key, minlength=n_cells),
+            'ppm_sum': np.bincount(key, weights=df['price_per_mile'].to_numpy(dtype='float64'), minlength=n_cells),
+            'cpm_sum': np.bincount(key, weights=df['count_per_mile'].to_numpy(dtype='float64'), minlength=n_cells),
+        })
+        return hourly[hourly['n'] > 0].reset_index(drop=True)
+
+    @staticmethod
+    def date_fingerprints(df: pd.DataFrame) -> Dict[str, str]:
+        """Row count and wrapping sum of row hashes per date: the cells do not depend on row order, nor does this."""
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+        hashes = pd.util.hash_pandas_object(df[SOURCE_COLUMNS], index=False).to_numpy()
+        order = np.argsort(date_codes, kind='stable')
+        counts = np.bincount(date_codes, minlength=len(dates))
+        starts = np.r_[0, np.cumsum(counts)[:-1]].astype('int64')
+        sums = np.add.reduceat(hashes[order], starts) if len(order) else np.array([], dtype='uint64')
+        return {str(pd.Timestamp(date).date()): f'{count}:{total}' for date, count, total in zip(dates, counts, sums)}
+
+    def read_manifest(self) -> Dict:
+        if self.manifest_path.exists() and self.hourly_path.exists():
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        return {'key': None, 'dates': {}}
+
+    def update_hourly_aggregates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Re-aggregate only dates that are new or whose trips changed; reuse the stored cells of the rest."""
+        fingerprints = self.date_fingerprints(df)
+        manifest = self.read_manifest()
+        key = code_version()
+        known = manifest['dates'] if manifest['key'] == key else {}
+        if self.dc.date_range is not None:
+            # A date-range run only sees its own dates; stored dates outside the range stand
+            start, end = (str(pd.Timestamp(bound).date()) for bound in self.dc.date_range)
+            fingerprints = {**{date: fp for date, fp in known.items() if not start <= date <= end}, **fingerprints}
+        kept = pd.to_datetime([date for date, fingerprint in fingerprints.items() if known.get(date) == fingerprint])
+        indexed = None
+        if len(kept):
+            with FileAccess.load_file(self.hourly_path) as stored:
+                indexed = stored[stored['date'].isin(kept)]
+        changed = ~df['date'].isin(kept)
+        hourly = pd.concat([indexed, self.aggregate_hours(df[changed])], ignore_index=True)
+        hourly = hourly.sort_values(['date', 'hour'], ignore_index=True)
+        logging.info(
+            f"Aggregated {int(changed.sum())} trip rows of {len(fingerprints) - len(kept)} new or changed dates; "
+            f"{len(hourly)} hourly cells over {len(fingerprints)} dates")
+        FileAccess.save_file(hourly, self.hourly_path, overwrite=True)
+        FileAccess.save_json({'key': key, 'dates': fingerprints}, self.manifest_path, overwrite=True)
+        return hourly
+
+    def rank(self, ppm_sum: np.ndarray, cpm_sum: np.ndarray, n: np.ndarray) -> List[Dict[str, List[int]]]:
+        """Top-k hours per group; hours without trips are left out, so sparse groups list fewer than k"""
+        k = self.dc.peak_hours_k
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ppm_mean = np.where(n > 0, ppm_sum / n, np.nan)
+        cpm_total = np.where(n > 0, cpm_sum, np.nan)
+        rankings = {
+            'max_ppm_hour': top_k_hours(ppm_mean, k, largest=True),
+            'min_ppm_hour': top_k_hours(ppm_mean, k, largest=False),
+            'max_count_hour': top_k_hours(cpm_total, k, largest=True),
+            'min_count_hour': top_k_hours(cpm_total, k, largest=False),
+        }
+        return [
+            {name: [int(hour) for hour in ranks[row] if n[row, hour] > 0] for name, ranks in rankings.items()}
+            for row in range(len(n))]
+
+    def build_index(self, hourly: pd.DataFrame) -> Dict:
+        dates = pd.to_datetime(hourly['date'])
+        hour = hourly['hour'].to_numpy(dtype='int64')
+        iso = dates.dt.isocalendar()
+        groupings = {
+            'global': (np.zeros(len(hourly), dtype='int64'), ['all']),
+            'by_dow': (dates.dt.dayofweek.to_numpy(), DOW_NAMES),
+        }
+        week_codes, weeks = pd.factorize(iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2), sort=True)
+        groupings['by_week'] = (week_codes, list(weeks))
+
+        index = {}
+        for level, (codes, labels) in groupings.items():
+            cell = codes * 24 + hour
+            sums = [
+                np.bincount(cell, weights=hourly[col].to_numpy(dtype='float64'), minlength=len(labels) * 24).reshape(-1, 24)
+                for col in ['ppm_sum', 'cpm_sum', 'n']]
+            ranked = self.rank(*sums)
+            if level == 'global':
+                index.update(ranked[0])
+            else:
+                index[level] = {label: ranks for label, ranks, total in zip(labels, ranked, sums[2].sum(axis=1)) if total > 0}
+        logging.info(f"Peak hours: {json.dumps({k: v for k, v in index.items() if k.endswith('hour')})}")
+        return index
+
+    @staticmethod
+    def read(path: Path) -> Dict:
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    @staticmethod
+    def hours(index: Dict, ranking: str = 'max_count_hour', dow: Optional[str] = None, week: Optional[str] = None) -> List[int]:
+        """Ranked hours for one ranking, optionally for a day of week (``'Mon'``) or ISO week (``'2015-W19'``)."""
+        if dow is not None:
+            return index['by_dow'][dow][ranking]
+        if week is not None:
+            return index['by_week'][week][ranking]
+        return index[ranking]
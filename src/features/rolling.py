@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import List
+from typing import Optional
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from src.features.aggregation import encode_column
+
+ROLLING_STATS = ['mean', 'sum', 'max', 'min']
+
+
+class RollingWindow:
+    """Time-based rolling statistics over a 2-D block of columns.
+
+    Each row's window is the rows of its group with ``on`` in ``(t - window, t]``, up to and including
+    the row itself, like ``df.rolling(window, on=on)`` with NaNs skipped. Window starts for every row
+    come from one ``searchsorted`` over a (group, time rank) key, so they are computed once and shared
+    by every column and statistic. ``mean``/``sum`` are differences of cumulative sums; ``max``/``min``
+    are two lookups in a doubling table of power-of-two block extremes, built one level at a time.
+    """
+
+    def __init__(self, df: pd.DataFrame, window: Union[str, pd.Timedelta], on: str = 'timestamp', by: Optional[str] = None):
+        times = df[on].to_numpy(dtype='datetime64[ns]').astype('int64')
+        if by is None:
+            groups = np.zeros(len(df), dtype='int64')
+        else:
+            groups, n_groups = encode_column(df[by])
+            groups = np.where(groups < 0, n_groups, groups)
+
+        key_order = np.lexsort((times, groups))
+        self.order = None if np.all(key_order[1:] > key_order[:-1]) else key_order
+        if self.order is not None:
+            times, groups = times[self.order], groups[self.order]
+
+        # (group, time rank) is monotonic in sorted order, so one searchsorted finds every window start
+        unique_times = np.unique(times)
+        n_ranks = len(unique_times) + 1
+        key = groups * n_ranks + np.searchsorted(unique_times, times)
+        first_rank = np.searchsorted(unique_times, times - pd.Timedelta(window).value, side='right')
+        self.starts = np.searchsorted(key, groups * n_ranks + first_rank, side='left')
+        self.n_rows = len(df)
+
+    def _sorted(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype='float64')
+        return values if self.order is None else values[self.order]
+
+    def _unsorted(self, result: np.ndarray) -> np.ndarray:
+        if self.order is None:
+            return result
+        out = np.empty_like(result)
+        out[self.order] = result
+        return out
+
+    def _cumulative(self, values: np.ndarray, stat: str) -> np.ndarray:
+        valid = ~np.isnan(values)
+        zero = np.zeros((1, values.shape[1]))
+        sums = np.concatenate([zero, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+        counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+        window_sum = sums[1:] - sums[self.starts]
+        window_count = counts[1:] - counts[self.starts]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = window_sum / window_count if stat == 'mean' else window_sum
+        return np.where(window_count > 0, result, np.nan)
+
+    def _extreme(self, values: np.ndarray, stat: str) -> np.ndarray:
+        reduce = np.fmax if stat == 'max' else np.fmin
+        ends = np.arange(self.n_rows)
+        levels = np.log2(ends - self.starts + 1).astype('int64')
+        result = np.empty_like(values)
+        # table[i] holds the extreme of rows i .. i + 2**level - 1
+        table = values.copy()
+        for level in range(int(levels.max()) + 1 if self.n_rows else 0):
+            if level:
+                span = 1 << (level - 1)
+                table[:-span] = reduce(table[:-span], table[span:])
+            rows = np.flatnonzero(levels == level)
+            result[rows] = reduce(table[self.starts[rows]], table[rows + 1 - (1 << level)])
+        return result
+
+    def aggregate(self, values: np.ndarray, stat: str = 'mean') -> np.ndarray:
+        """Rolling ``stat`` of each column of a 2-D ``values`` block, row-aligned with the source frame."""
+        if stat not in ROLLING_STATS:
+            raise ValueError(f'Unsupported rolling statistic: {stat}, expected one of {ROLLING_STATS}')
+        values = self._sorted(values)
+        if stat in ['mean', 'sum']:
+            result = self._cumulative(values, stat)
+        else:
+            result = self._extreme(values, stat)
+        return self._unsorted(result)
+
+    def apply(
+            self, df: pd.DataFrame, columns: List[str], stat: str = 'mean', suffix: str = '_rolling',
+            mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Add ``<col><suffix>`` for a block of columns, keeping the block's float width.
+
+        Rows outside ``mask`` count as NaN, so time-based windows over the valid rows are unchanged.
+        """
+        if not columns:
+            return df
+        block = df[columns].to_numpy()
+        if mask is not None:
+            block = np.where(mask[:, None], block, np.nan)
+        result = self.aggregate(block, stat).astype(np.result_type(block.dtype, np.float32), copy=False)
+        for i, col in enumerate(columns):
+            df[col + suffix] = result[:, i]
+        return df
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+from config.state_init import StateManager
+from src.features.aggregation import encode_column
+from src.features.aggregation import GroupedAggregator
+from utils.execution import TaskExecutor
+
+CUBE_STATS = ['sum', 'count', 'min', 'max', 'mean']
+CUBE_COLUMNS = {'price_per_mile': 'ppm', 'count_per_mile': 'cpm'}
+
+
+class TimeRollupCube:
+    """Hour -> 3h -> 6h -> day aggregates of price/count per mile.
+
+    Trip rows are scanned once into dense (date x 24) hourly cells; the coarser levels are roll-ups
+    of those cells along the hour axis, so they never touch the trip rows again.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, cells: Dict[str, Dict[str, Dict[str, np.ndarray]]], period_labels: Dict[str, List[str]], hour_periods: Dict[str, np.ndarray]):
+        self.dates = dates
+        self.cells = cells
+        self.period_labels = period_labels
+        self.hour_periods = hour_periods
+        self._row_index = None
+        self._row_source = None
+
+    @classmethod
+    def from_frame(
+            cls, df: pd.DataFrame, mc: ModelConfig, columns: Tuple[str, ...] = tuple(CUBE_COLUMNS),
+            mask: Optional[np.ndarray] = None) -> TimeRollupCube:
+        """Cube over the rows of ``df`` (only those where ``mask`` is set, when given)."""
+        date_codes, n_dates = encode_column(df['date'])
+        if mask is not None:
+            date_codes = np.where(mask, date_codes, -1)
+        hour = df['hour'].to_numpy(dtype='int64')
+        groups = GroupedAggregator.from_codes([(date_codes, n_dates), (hour, 24)])
+        hourly = {
+            col: {stat: values.reshape(n_dates, 24) for stat, values in groups.aggregate(df[col], ['sum', 'count', 'min', 'max']).items()}
+            for col in columns}
+
+        day_labels = {'3h': mc.hour_day_parts(3), '6h': mc.hour_day_parts(6), 'day': ['day'] * 24}
+        period_labels = {'hour': [str(h) for h in range(24)]}
+        hour_periods = {'hour': np.arange(24)}
+        cells = {'hour': {col: dict(stats) for col, stats in hourly.items()}}
+        for level, labels in day_labels.items():
+            starts = np.flatnonzero(np.r_[True, np.array(labels[1:]) != np.array(labels[:-1])])
+            period_labels[level] = [labels[i] for i in starts]
+            hour_periods[level] = np.cumsum(np.r_[False, np.array(labels[1:]) != np.array(labels[:-1])])
+            cells[level] = {
+                col: {
+                    'sum': np.add.reduceat(np.nan_to_num(stats['sum']), starts, axis=1),
+                    'count': np.add.reduceat(np.nan_to_num(stats['count']), starts, axis=1),
+                    'min': np.fmin.reduceat(stats['min'], starts, axis=1),
+                    'max': np.fmax.reduceat(stats['max'], starts, axis=1),
+                } for col, stats in hourly.items()}
+
+        for level_cells in cells.values():
+            for stats in level_cells.values():
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    stats['mean'] = np.where(stats['count'] > 0, np.nan_to_num(stats['sum']) / stats['count'], np.nan)
+                stats['sum'] = np.where(stats['count'] > 0, np.nan_to_num(stats['sum']), np.nan)
+
+        first_date = df['date'].min()
+        dates = pd.date_range(first_date, periods=n_dates, freq='D') if n_dates else pd.DatetimeIndex([])
+        cube = cls(dates, cells, period_labels, hour_periods)
+        cube._row_index = (date_codes, hour)
+        cube._row_source = (df['date'].to_numpy(), None if mask is None else mask.copy())
+        return cube
+
+    def covers(self, df: pd.DataFrame, columns: Tuple[str, ...], mask: Optional[np.ndarray] = None) -> bool:
+        """Whether the cube holds ``columns`` and was built over exactly the rows of ``df`` (same dates, hours
+        and mask, in the same order), so its cells and ``broadcast`` still apply to ``df``."""
+        if self._row_index is None or not set(columns) <= set(self.cells['hour']):
+            return False
+        (_, hour), (dates, built_mask) = self._row_index, self._row_source
+        if len(hour) != len(df) or (mask is None) != (built_mask is None):
+            return False
+        return (
+            (mask is None or np.array_equal(mask, built_mask))
+            and np.array_equal(hour, df['hour'].to_numpy(dtype='int64'))
+            and np.array_equal(dates, df['date'].to_numpy()))
+
+    def take(self, order: np.ndarray) -> TimeRollupCube:
+        """The same cells, with the row index following ``df.take(order)``"""
+        cube = TimeRollupCube(self.dates, self.cells, self.period_labels, self.hour_periods)
+        (date_codes, hour), (dates, mask) = self._row_index, self._row_source
+        cube._row_index = (date_codes[order], hour[order])
+        cube._row_source = (dates[order], None if mask is None else mask[order])
+        return cube
+
+    def broadcast(self, level: str, column: str, stat: str, dtype: str = 'float64') -> np.ndarray:
+        """Per-row values of one cube statistic for the frame the cube was built from."""
+        date_codes, hour = self._row_index
+        cells = self.cells[level][column][stat].astype(dtype, copy=False)
+        return cells[date_codes, self.hour_periods[level][hour]]
+
+    def row_order(self) -> Optional[np.ndarray]:
+        """Stable (date, hour) ordering of the source rows, or None when they are already in order.
+
+        Only rows in the cube decide whether the frame is sorted; masked rows (code -1) are dropped later,
+        so they are simply moved to the front when a sort is needed.
+        """
+        date_codes, hour = self._row_index
+        key = np.where(date_codes < 0, -1, date_codes * 24 + hour)
+        valid_key = key[date_codes >= 0]
+        if np.all(valid_key[1:] >= valid_key[:-1]):
+            return None
+        return np.argsort(key, kind='stable')
+
+    def to_frame(self) -> pd.DataFrame:
+        frames = []
+        for level, labels in self.period_labels.items():
+            n_periods = len(labels)
+            frame = pd.DataFrame({
+                'level': level,
+                'date': np.repeat(self.dates, n_periods),
+                'period': np.tile(labels, len(self.dates)),
+            })
+            for col, prefix in CUBE_COLUMNS.items():
+                if col in self.cells[level]:
+                    for stat in CUBE_STATS:
+                        frame[f'{prefix}_{stat}'] = self.cells[level][col][stat].ravel()
+            frames.append(frame[frame.filter(like='_count').sum(axis=1) > 0])
+        cube = pd.concat(frames, ignore_index=True)
+        cube['level'] = pd.Categorical(cube['level'], categories=list(self.period_labels))
+        cube['dow_num'] = cube['date'].dt.dayofweek.astype('int32')
+        return cube
+
+    @staticmethod
+    def slice(
+            cube: pd.DataFrame, level: str,
+            start: Optional[str] = None, end: Optional[str] = None,
+            dow: Optional[List[int]] = None, periods: Optional[List[str]] = None) -> pd.DataFrame:
+        """Cells of one level, filtered by inclusive date range, day-of-week numbers and period labels."""
+        mask = (cube['level'] == level).to_numpy()
+        if start is not None:
+            mask &= (cube['date'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (cube['date'] <= pd.Timestamp(end)).to_numpy()
+        if dow is not None:
+            mask &= cube['dow_num'].isin(dow).to_numpy()
+        if periods is not None:
+            mask &= cube['period'].isin(periods).to_numpy()
+        return cube[mask]
+
+
+class BuildRollupCube:
+    """Persist the hierarchical time rollup cube for builders, AnalyseBounds and reporting"""
+
+    def __init__(self, state: StateManager):
+        self.mc = state.model_config
+
+    def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        steps = [
+            self.build_cube,
+        ]
+        for step in steps:
+            df = TaskExecutor.run_child_step(step, df)
+        logging.info(f"Rollup cube cells per level:\n{df['level'].value_counts(sort=False)}")
+        return df
+
+    def build_cube(self, df: pd.DataFrame) -> pd.DataFrame:
+        return TimeRollupCube.from_frame(df, self.mc).to_frame()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import logging
+from statistics import NormalDist
+from typing import Callable
+from typing import List
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config.state_init import StateManager
+from src.features import geo
+from src.features.calendar import CalendarDimension
+from src.features.memory import frame_bytes
+from utils.file_access import FileAccess
+
+SAMPLE_METHODS = ['last', 'reservoir', 'stratified']
+WEIGHT_COLUMN = 'sample_weight'
+QUICK_LOOK_COLUMNS = ['price', 'count', 'distance']
+
+
+class StreamSampler:
+    """Seeded uniform sample without replacement, drawn from a stream of chunks in bounded memory.
+
+    Every row draws a uniform priority key and each stratum keeps its rows with the smallest keys, so
+    the kept rows are a uniform sample of the stratum however the stream is chunked (reservoir sampling
+    by priority). Only chunk rows that beat their stratum's current cut-off are merged in, so after the
+    first chunks the merge is small. ``strata`` maps a chunk to int64 stratum ids; the ``capacity`` is
+    shared equally between the strata seen so far (at least one row each). Without ``strata`` it is a
+    plain reservoir of ``capacity`` rows.
+    """
+
+    def __init__(self, capacity: int, seed: int = 0, strata: Optional[Callable[[pd.DataFrame], np.ndarray]] = None):
+        if capacity < 1:
+            raise ValueError(f'Sample capacity must be at least one row, got {capacity}')
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.strata = strata
+        self.kept: Optional[pd.DataFrame] = None
+        self.keys = np.array([], dtype='float64')
+        self.stratum = np.array([], dtype='int64')
+        self.position = np.array([], dtype='int64')
+        self.population = pd.Series(dtype='int64')
+        self.n_seen = 0
+
+    @property
+    def per_stratum(self) -> int:
+        return max(1, self.capacity // max(1, len(self.population)))
+
+    def _cutoffs(self, stratum: np.ndarray) -> np.ndarray:
+        """Largest kept key of each row's stratum once that stratum is full, else 1 (every key enters)."""
+        if self.kept is None:
+            return np.ones(len(stratum))
+        kept = pd.DataFrame({'stratum': self.stratum, 'key': self.keys}).groupby('stratum')['key'].agg(['max', 'size'])
+        full = kept.loc[kept['size'] >= self.per_stratum, 'max']
+        cutoffs = full.reindex(stratum).to_numpy()
+        return np.where(np.isnan(cutoffs), 1.0, cutoffs)
+
+    def update(self, chunk: pd.DataFrame) -> StreamSampler:
+        n_rows = len(chunk)
+        keys = self.rng.random(n_rows)
+        stratum = np.zeros(n_rows, dtype='int64') if self.strata is None else np.asarray(self.strata(chunk), dtype='int64')
+        ids, counts = np.unique(stratum, return_counts=True)
+        self.population = self.population.add(pd.Series(counts, index=ids), fill_value=0).astype('int64')
+
+        enter = np.flatnonzero(keys < self._cutoffs(stratum))
+        chunk = chunk.iloc[enter].reset_index(drop=True)
+        frame = chunk if self.kept is None else pd.concat([self.kept, chunk], ignore_index=True)
+        keys = np.concatenate([self.keys, keys[enter]])
+        stratum = np.concatenate([self.stratum, stratum[enter]])
+        position = np.concatenate([self.position, self.n_seen + enter])
+        self.n_seen += n_rows
+
+        # Rank rows by key within their stratum and keep each stratum's first ``per_stratum``
+        order = np.lexsort((keys, stratum))
+        sorted_stratum = stratum[order]
+        starts = np.flatnonzero(np.r_[True, sorted_stratum[1:] != sorted_stratum[:-1]]) if len(order) else np.array([], dtype='int64')
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        keep = np.sort(order[rank < self.per_stratum])
+        self.kept = frame.take(keep).reset_index(drop=True)
+        self.keys, self.stratum, self.position = keys[keep], stratum[keep], position[keep]
+        return self
+
+    def sample(self) -> pd.DataFrame:
+        """Kept rows in stream order, with ``sample_weight`` = stratum rows seen / stratum rows kept."""
+        if self.kept is None:
+            return pd.DataFrame()
+        if len(self.population) > self.capacity:
+            logging.warning(f'{len(self.population)} strata exceed the sample capacity of {self.capacity} rows; kept one row per stratum')
+        order = np.argsort(self.position, kind='stable')
+        df = self.kept.take(order).reset_index(drop=True)
+        stratum = self.stratum[order]
+        kept = pd.Series(stratum).value_counts()
+        df[WEIGHT_COLUMN] = self.population.reindex(stratum).to_numpy() / kept.reindex(stratum).to_numpy()
+        return df
+
+    def sample_strata(self) -> np.ndarray:
+        """Stratum id of each row of ``sample()``."""
+        return self.stratum[np.argsort(self.position, kind='stable')]
+
+
+def estimate_means(
+        df: pd.DataFrame, columns: List[str], strata: np.ndarray, population: pd.Series,
+        by: Optional[str] = None, confidence: float = 0.95) -> pd.DataFrame:
+    """Population means of ``columns`` (overall, or per ``by`` group) from a stratified sample, with normal CIs.
+
+    Each (group, stratum) cell is weighted by its estimated population ``N_h * n_gh / n_h``; the
+    variance is the stratified one, ``sum (W_gh / W_g)^2 (1 - n_h / N_h) s_gh^2 / n_gh``, conditional on
+    the group sizes. Cells with a single sampled row contribute no variance.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    sampled = pd.Series(strata).value_counts()
+    frame = df[columns].reset_index(drop=True)
+    frame['_group'] = 'all' if by is None else df[by].astype(str).to_numpy()
+    frame['_stratum'] = strata
+    frame['_n_h'] = sampled.reindex(strata).to_numpy()
+    frame['_N_h'] = population.reindex(strata).to_numpy()
+    cells = frame.groupby(['_group', '_stratum'], observed=True)
+    sizes = cells[['_n_h', '_N_h']].first()
+
+    rows = []
+    for col in columns:
+        stats = cells[col].agg(['count', 'mean', 'var']).join(sizes)
+        stats = stats[stats['count'] > 0]
+        stats['weight'] = stats['_N_h'] * stats['count'] / stats['_n_h']
+        stats['term'] = (1 - stats['_n_h'] / stats['_N_h']) * stats['var'].fillna(0) / stats['count']
+        for group, cell in stats.groupby(level='_group'):
+            share = cell['weight'] / cell['weight'].sum()
+            estimate = float((share * cell['mean']).sum())
+            std_error = float(np.sqrt((share ** 2 * cell['term']).sum()))
+            rows.append({
+                'group': group,
+                'column': col,
+                'estimate': estimate,
+                'std_error': std_error,
+                'ci_low': estimate - z * std_error,
+                'ci_high': estimate + z * std_error,
+                'n_sample': int(cell['count'].sum()),
+                'population': float(cell['weight'].sum()),
+            })
+    return pd.DataFrame(rows)
+
+
+class TripSampler:
+    """Seeded analysis sample of ``process1``, streamed in chunks within ``sample_memory_mb``.
+
+    ``reservoir`` is a uniform sample of all trips; ``stratified`` keeps an equal share of the budget for
+    every (date, 3h day part) slot, so old and quiet periods are as well represented as recent ones.
+    ``sample_weight`` carries the number of trips each sampled row stands for. ``quick_look`` reports
+    population means with confidence intervals from the sample alone.
+    """
+
+    def __init__(self, state: StateManager):
+        self.dc = state.data_config
+        self.mc = state.model_config
+        self.source = state.paths.get_path('process1')
+        # 'last' is sliced inside BuildAnalysisFeatures; a streamed draw is stratified unless asked otherwise
+        self.method = self.dc.sample_method if self.dc.sample_method != 'last' else 'stratified'
+        if self.method not in SAMPLE_METHODS:
+            raise ValueError(f'Unknown sample method: {self.method}, expected one of {SAMPLE_METHODS}')
+        self.day_part_codes = pd.factorize(pd.Series(self.mc.hour_day_parts(3)))[0]
+        self.n_day_parts = int(self.day_part_codes.max()) + 1
+
+    def pipeline(self, df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        return self.draw().sample()
+
+    def slot_strata(self, df: pd.DataFrame) -> np.ndarray:
+        """(date, 3h day part) stratum id of each trip"""
+        hours = df['timestamp'].to_numpy(dtype='datetime64[ns]').astype('datetime64[h]').astype('int64')
+        days, hour = np.divmod(hours, 24)
+        return days * self.n_day_parts + self.day_part_codes[hour]
+
+    def capacity(self, chunk: pd.DataFrame) -> int:
+        """Rows that fit the budget at this chunk's per-row size (plus key, stratum and position)"""
+        row_bytes = frame_bytes(chunk) / max(1, len(chunk)) + 24
+        return max(1, int(self.dc.sample_memory_mb * 1024**2 // row_bytes))
+
+    def draw(self) -> StreamSampler:
+        sampler = None
+        for chunk in FileAccess.iter_chunks(self.source, self.dc.sample_chunk_rows, self.dc.date_range):
+            if sampler is None:
+                strata = self.slot_strata if self.method == 'stratified' else None
+                sampler = StreamSampler(self.capacity(chunk), seed=self.dc.sample_seed, strata=strata)
+            sampler.update(chunk)
+        if sampler is None:
+            raise ValueError(f'No trips to sample in ``{self.source}``')
+        logging.info(
+            f"{self.method.capitalize()} sample: {len(sampler.kept)} of {sampler.n_seen} trips "
+            f"across {len(sampler.population)} strata (capacity {sampler.capacity} rows)")
+        return sampler
+
+    def quick_look(self, df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Trip means overall and per 3h day part, with ``sample_confidence`` intervals"""
+        sampler = self.draw()
+        sample = sampler.sample()
+        sample['distance'] = geo.distance(
+            sample['pickup_latitude'], sample['pickup_longitude'],
+            sample['dropoff_latitude'], sample['dropoff_longitude'], method=self.dc.distance_method)
+        sample = CalendarDimension(self.mc).attach(sample, ['day_part_3hr'])
+        strata = sampler.sample_strata()
+        summary = pd.concat([
+            estimate_means(sample, QUICK_LOOK_COLUMNS, strata, sampler.population, confidence=self.dc.sample_confidence),
+            estimate_means(sample, QUICK_LOOK_COLUMNS, strata, sampler.population, 'day_part_3hr', self.dc.sample_confidence),
+        ], ignore_index=True)
+        logging.info(f"Quick look ({self.dc.sample_confidence:.0%} CI):\n{summary.round(4).to_string(index=False)}")
+        return summary
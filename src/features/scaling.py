@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import logging
+import warnings
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.file_access import FileAccess
+
+
+class FeatureScaler:
+    """Min-max scaling for blocks of columns, with the fitted bounds persisted next to the features.
+
+    ``fit`` takes the NaN-skipping min/max of every column in a block in one pass over a single 2-D
+    array; ``transform`` writes ``<col>_scaled`` for the whole block at once. Output matches
+    ``MinMaxScaler`` (a constant column scales to the bottom of ``feature_range``). Loading saved
+    bounds lets later runs and consumers transform without refitting.
+    """
+
+    def __init__(self, feature_range: Tuple[float, float] = (0, 1)):
+        self.feature_range = feature_range
+        self.params: Dict[str, Tuple[float, float]] = {}
+
+    def fit(self, df: pd.DataFrame, columns: List[str], mask: Optional[np.ndarray] = None) -> FeatureScaler:
+        """Fit bounds on every row, or only the rows where ``mask`` is set."""
+        values = df[columns].to_numpy()
+        if mask is not None:
+            values = values[mask]
+        if len(values) == 0:
+            raise ValueError(f'Cannot fit scaling bounds for {columns}: no valid rows')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns fit to NaN bounds
+            mins, maxs = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        self.params.update({col: (float(lo), float(hi)) for col, lo, hi in zip(columns, mins, maxs)})
+        return self
+
+    def transform(self, df: pd.DataFrame, columns: List[str], suffix: str = '_scaled') -> pd.DataFrame:
+        missing = [col for col in columns if col not in self.params]
+        if missing:
+            raise ValueError(f'No fitted scaling bounds for: {missing}')
+        bounds = np.array([self.params[col] for col in columns], dtype='float64')
+        data_range = bounds[:, 1] - bounds[:, 0]
+        data_range[data_range == 0] = 1.0
+        low, high = self.feature_range
+        values = df[columns].to_numpy()
+        # float32 blocks stay float32; anything else is scaled as float64
+        values = values.astype(np.result_type(values.dtype, np.float32), copy=False)
+        scaled = (values - bounds[:, 0].astype(values.dtype)) * ((high - low) / data_range).astype(values.dtype) + low
+        for i, col in enumerate(columns):
+            df[col + suffix] = scaled[:, i]
+        return df
+
+    def fit_transform(self, df: pd.DataFrame, columns: List[str], suffix: str = '_scaled') -> pd.DataFrame:
+        return self.fit(df, columns).transform(df, columns, suffix)
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        FileAccess.save_json({'feature_range': list(self.feature_range), 'params': self.params}, path, overwrite=True)
+
+    @classmethod
+    def load(cls, path: Path) -> FeatureScaler:
+        if not Path(path).is_file():
+            raise FileNotFoundError(
+                f'No saved scaling bounds at ``{path}``; run the feature build with fit_scalers=True first to fit and save them')
+        with open(path, 'r') as file:
+            saved = json.load(file)
+        scaler = cls(tuple(saved['feature_range']))
+        scaler.params = {col: tuple(bounds) for col, bounds in saved['params'].items()}
+        logging.debug(f'Loaded scaling bounds for {len(scaler.params)} columns from ``{path}``')
+        return scaler
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import List
+
+import pandas as pd
+
+from src.features import geo
+from src.features.memory import to_low_memory
+from src.features.rollup_cube import TimeRollupCube
+from utils.execution import TaskExecutor
+
+
+class TripFeatureSteps:
+    """Steps and step plumbing shared by the feature builders.
+
+    The base trip features are defined once here, so both builders run the very same functions. Builders
+    set ``dc``, ``mc``, ``calendar``, ``float_dtype``, ``scaler``/``scaler_path``, ``memory``, ``validity``,
+    ``cache``, ``cached_steps``, ``cube`` and ``cube_columns``.
+    """
+
+    def __getstate__(self):
+        # Workers only run the steps; the cache, partition store and last cube stay in the parent process
+        return {**self.__dict__, 'cache': None, 'partitions': None, 'cube': None}
+
+    def run_steps(self, steps, df: pd.DataFrame) -> pd.DataFrame:
+        steps = [self.validity.track(step) for step in steps]
+        if self.memory is not None:
+            steps = [self.memory.track(step) for step in steps]
+        if self.cache is not None:
+            df = self.cache.run_steps(steps, df, self.cached_steps)
+        else:
+            for step in steps:
+                df = TaskExecutor.run_child_step(step, df)
+        df = self.compact_valid_rows(df)
+        self.cube = None
+        self.validity.log()
+        if self.memory is not None:
+            self.memory.log()
+        if self.dc.fit_scalers:
+            self.scaler.save(self.scaler_path)
+        return df
+
+    def scale(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Add ``<col>_scaled`` for a block of columns, refitting the bounds only when ``fit_scalers`` is set"""
+        if self.dc.fit_scalers:
+            self.scaler.fit(df, columns, mask=self.validity.get(df))
+        return self.scaler.transform(df, columns)
+
+    def record_memory(self, step_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        return df if self.memory is None else self.memory.record(step_name, df)
+
+    def time_cube(self, df: pd.DataFrame) -> TimeRollupCube:
+        """Rollup cube of ``df``'s valid rows, scanned once and reused by later steps while the rows are unchanged"""
+        mask = self.validity.get(df)
+        if self.cube is None or not self.cube.covers(df, self.cube_columns, mask):
+            self.cube = TimeRollupCube.from_frame(df, self.mc, columns=self.cube_columns, mask=mask)
+        return self.cube
+
+    def sort_by_hour(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rows in (date, hour) order (usually they already are), keeping the cube aligned with them"""
+        order = self.time_cube(df).row_order()
+        if order is None:
+            return df
+        self.cube = self.cube.take(order)
+        return df.take(order)
+
+    def compact_valid_rows(self, df):
+        return self.validity.compact(df)
+
+    def build_low_memory_dtypes(self, df):
+        return to_low_memory(df) if self.dc.low_memory else df
+
+    def build_dt_features(self, df):
+        return self.calendar.attach(df, ['date', 'hour', 'dow_num', 'is_weekend', 'week', 'date_hour', 'day_part_3hr'])
+
+    def build_haversine_distance(self, df):
+        df['distance'] = geo.distance(
+            df['pickup_latitude'], df['pickup_longitude'],
+            df['dropoff_latitude'], df['dropoff_longitude'],
+            method=self.dc.distance_method, dtype=self.float_dtype)
+        return df
+
+    def build_price_per_mile(self, df):
+        df['price_per_mile'] = df['price'] / df['distance']
+        return self.validity.filter(df, (df['price_per_mile'] > 0) & (df['price_per_mile'] < 100))
+
+    def build_count_per_mile(self, df):
+        df['count_per_mile'] = df['count'] / df['distance']
+        return self.validity.filter(df, (df['count_per_mile'] > 0) & (df['count_per_mile'] < 100))
+
+    def round_and_optimize_df(self, df):
+        float_cols = df.select_dtypes(include=['float32', 'float64']).columns
+        df[float_cols] = df[float_cols].round(4)
+        int_cols = df.select_dtypes(include=['int64']).columns
+        df[int_cols] = df[int_cols].astype('int32')
+        return df
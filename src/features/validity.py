@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+from functools import wraps
+from typing import Callable
+from typing import Iterable
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+VALID_COLUMN = '_valid'
+
+
+class ValidityMask:
+    """Rows dropped by a builder's filters, accumulated in a boolean ``_valid`` column instead of copied out.
+
+    ``filter`` and ``dropna`` stand in for ``df[keep]`` and ``df.replace([inf, -inf], nan).dropna()``:
+    they only clear mask bits, so the ever-widening frame is not copied at every step. The mask is a
+    column, so it survives the feature cache, the date partition store and worker processes. Steps
+    that aggregate over rows (cubes, scaler fits, quantiles, rolling windows, lags) read ``get`` and
+    skip masked rows, which keeps every surviving row identical to eager filtering. ``compact`` drops
+    the masked rows in one copy, at the configured ``checkpoints`` and once at the end.
+
+    With ``enabled=False`` every method filters eagerly, exactly as the builders used to.
+    """
+
+    def __init__(self, name: str, enabled: bool = True, checkpoints: Iterable[str] = ()):
+        self.name = name
+        self.enabled = enabled
+        self.checkpoints = set(checkpoints)
+        self.copies_avoided = 0
+        self.bytes_avoided = 0
+        self.compactions = 0
+
+    @staticmethod
+    def get(df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Boolean row mask, or None while every row is valid."""
+        return df[VALID_COLUMN].to_numpy() if VALID_COLUMN in df.columns else None
+
+    @staticmethod
+    def values(df: pd.DataFrame, col: str) -> pd.Series:
+        """``df[col]`` restricted to valid rows, for row statistics such as quantiles."""
+        mask = ValidityMask.get(df)
+        return df[col] if mask is None else df[col][mask]
+
+    def _avoided(self, df: pd.DataFrame, copies: int = 1):
+        self.copies_avoided += copies
+        self.bytes_avoided += copies * int(df.memory_usage(index=True, deep=False).sum())
+
+    def filter(self, df: pd.DataFrame, keep) -> pd.DataFrame:
+        keep = np.asarray(keep, dtype=bool)
+        if not self.enabled:
+            return df[keep]
+        mask = self.get(df)
+        df[VALID_COLUMN] = keep if mask is None else mask & keep
+        self._avoided(df)
+        return df
+
+    @staticmethod
+    def _finite_rows(df: pd.DataFrame) -> np.ndarray:
+        """Rows without NaN/NaT or +-inf in any column, column by column rather than on a replaced copy."""
+        keep = np.ones(len(df), dtype=bool)
+        for col in df.columns:
+            if col == VALID_COLUMN:
+                continue
+            values = df[col]
+            if pd.api.types.is_float_dtype(values.dtype):
+                keep &= np.isfinite(values.to_numpy())
+            else:
+                keep &= values.notna().to_numpy()
+        return keep
+
+    def dropna(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df.replace([np.inf, -np.inf], np.nan).dropna()``"""
+        if not self.enabled:
+            return df.replace([np.inf, -np.inf], np.nan).dropna()
+        mask = self.get(df)
+        keep = self._finite_rows(df)
+        df[VALID_COLUMN] = keep if mask is None else mask & keep
+        self._avoided(df, copies=2)
+        return df
+
+    def replace_inf(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df.replace([np.inf, -np.inf], np.nan)``, rewriting only float columns that hold an inf."""
+        if not self.enabled:
+            return df.replace([np.inf, -np.inf], np.nan)
+        for col in df.columns:
+            if pd.api.types.is_float_dtype(df[col].dtype):
+                values = df[col].to_numpy()
+                infinite = np.isinf(values)
+                if infinite.any():
+                    df[col] = np.where(infinite, np.nan, values).astype(values.dtype, copy=False)
+        self._avoided(df)
+        return df
+
+    def compact(self, df: pd.DataFrame, step_name: str = 'end') -> pd.DataFrame:
+        mask = self.get(df)
+        if mask is None:
+            return df
+        self.compactions += 1
+        logging.debug(f"{self.name}: compacting after `{step_name}`, dropping {int((~mask).sum())} of {len(df)} rows")
+        return df[mask].drop(columns=VALID_COLUMN)
+
+    def track(self, step: Callable) -> Callable:
+        """``step``, compacting its output when it is one of the checkpoints."""
+        if step.__name__ not in self.checkpoints:
+            return step
+
+        @wraps(step)
+        def wrapper(df: pd.DataFrame) -> pd.DataFrame:
+            return self.compact(step(df), step.__name__)
+        return wrapper
+
+    def log(self):
+        if self.enabled:
+            logging.info(
+                f"{self.name} validity mask: avoided {self.copies_avoided} frame copies "
+                f"(~{self.bytes_avoided / 1024**2:.1f} MB) with {self.compactions} compaction(s)")
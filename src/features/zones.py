@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+from config.state_init import StateManager
+from src.features.aggregation import encode_column
+from src.features.aggregation import GroupedAggregator
+from utils.execution import TaskExecutor
+
+ZONE_STATS = ['sum', 'count', 'mean', 'max', 'min']
+
+
+class ZoneGrid:
+    """Regular lat/lon grid over the service area.
+
+    A coordinate's zone is ``row * n_cols + col`` from two floor divisions, so lookup is O(1) per trip
+    with no spatial search. Everything outside the bounds (or missing) shares one last ``outside`` zone.
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float], cell_size: float):
+        self.lat_min, self.lat_max, self.lon_min, self.lon_max = bounds
+        self.cell_size = cell_size
+        self.n_rows = int(np.ceil((self.lat_max - self.lat_min) / cell_size))
+        self.n_cols = int(np.ceil((self.lon_max - self.lon_min) / cell_size))
+        self.outside = self.n_rows * self.n_cols
+        self.n_zones = self.outside + 1
+
+    @classmethod
+    def from_config(cls, mc: ModelConfig) -> ZoneGrid:
+        return cls(mc.zone_bounds, mc.zone_cell_size)
+
+    def zone(self, lat, lon) -> np.ndarray:
+        row = np.floor((np.asarray(lat, dtype='float64') - self.lat_min) / self.cell_size)
+        col = np.floor((np.asarray(lon, dtype='float64') - self.lon_min) / self.cell_size)
+        inside = (row >= 0) & (row < self.n_rows) & (col >= 0) & (col < self.n_cols)
+        return np.where(inside, row * self.n_cols + col, self.outside).astype('int32')
+
+    def centroid(self, zone) -> Tuple[np.ndarray, np.ndarray]:
+        """Cell centre coordinates (NaN for the outside zone)."""
+        zone = np.asarray(zone)
+        row, col = np.divmod(zone, self.n_cols)
+        inside = zone != self.outside
+        lat = np.where(inside, self.lat_min + (row + 0.5) * self.cell_size, np.nan)
+        lon = np.where(inside, self.lon_min + (col + 0.5) * self.cell_size, np.nan)
+        return lat, lon
+
+
+class ZoneDemand:
+    """Count per mile aggregated per (pickup zone, date, 3h day part) slot, broadcast back to trips.
+
+    Only slots that actually occur are kept: the combined zone/date/day part key is factorized before
+    aggregating, so the grid size does not blow up the group arrays.
+    """
+
+    def __init__(self, df: pd.DataFrame, grid: ZoneGrid, zone_col: str = 'pickup_zone', mask: Optional[np.ndarray] = None):
+        self.grid = grid
+        date_codes, self.n_dates = encode_column(df['date'])
+        part = df['day_part_3hr']
+        self.day_parts = list(part.cat.categories) if isinstance(part.dtype, pd.CategoricalDtype) else sorted(part.unique())
+        part_codes = pd.Categorical(part, categories=self.day_parts).codes.astype('int64')
+        self.first_date = df['date'].min()
+
+        key = (df[zone_col].to_numpy().astype('int64') * self.n_dates + date_codes) * len(self.day_parts) + part_codes
+        if mask is None:
+            codes, self.keys = pd.factorize(key)
+        else:
+            # Masked rows keep code -1, which GroupedAggregator leaves out of every group
+            codes = np.full(len(key), -1, dtype='int64')
+            codes[mask], self.keys = pd.factorize(key[mask])
+        self.groups = GroupedAggregator.from_codes([(codes, len(self.keys))])
+        self.stats = self.groups.aggregate(df['count_per_mile'], ZONE_STATS)
+
+    def broadcast(self, stat: str) -> np.ndarray:
+        return self.groups.broadcast(self.stats[stat])
+
+    def to_frame(self) -> pd.DataFrame:
+        rest, part_codes = np.divmod(np.asarray(self.keys), len(self.day_parts))
+        zone, date_codes = np.divmod(rest, self.n_dates)
+        lat, lon = self.grid.centroid(zone)
+        frame = pd.DataFrame({
+            'zone': zone.astype('int32'),
+            'zone_lat': lat,
+            'zone_lon': lon,
+            'date': pd.Timestamp(self.first_date).normalize() + pd.to_timedelta(date_codes, unit='D'),
+            'day_part_3hr': pd.Categorical.from_codes(part_codes, categories=self.day_parts),
+        })
+        for stat in ZONE_STATS:
+            frame[f'cpm_{stat}'] = self.stats[stat]
+        return frame.sort_values(['date', 'day_part_3hr', 'zone'], ignore_index=True)
+
+
+class BuildZoneDemand:
+    """Persist zone x 3h slot demand aggregates for reporting and localized surge analysis"""
+
+    def __init__(self, state: StateManager):
+        self.grid = ZoneGrid.from_config(state.model_config)
+
+    def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        steps = [
+            self.build_zone_demand,
+        ]
+        for step in steps:
+            df = TaskExecutor.run_child_step(step, df)
+        logging.info(f"Zone demand: {len(df)} slots across {df['zone'].nunique()} of {self.grid.n_zones} zones")
+        return df
+
+    def build_zone_demand(self, df: pd.DataFrame) -> pd.DataFrame:
+        if 'pickup_zone' not in df.columns:
+            df['pickup_zone'] = self.grid.zone(df['pickup_latitude'], df['pickup_longitude'])
+        return ZoneDemand(df, self.grid).to_frame()
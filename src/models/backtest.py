@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.state_init import StateManager
+from src.features.build_ped import BuildPED
+from src.models.pricing_engine import PricingEngine
+from utils.execution import TaskExecutor
+
+
+# Below this many test days a process pool costs more to start and feed than the windows take to run
+MIN_PARALLEL_DAYS = 365
+
+
+def simulate_window(payload: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]) -> Dict[str, float]:
+    """Reprice one walk-forward test window of trips and apply a constant-elasticity demand response.
+
+    Each trip's expected volume scales by ``multiplier ** elasticity`` of its day part.
+    """
+    price, multiplier, day_part_codes, elasticity = payload
+    volume = multiplier ** elasticity[day_part_codes]
+    return {
+        'base_revenue': float(price.sum()),
+        'dynamic_revenue': float((price * multiplier * volume).sum()),
+        'base_volume': float(len(price)),
+        'dynamic_volume': float(volume.sum()),
+    }
+
+
+class PricingBacktest:
+    """Walk-forward replay of DynamicPricing with an elasticity-based demand response"""
+
+    def __init__(self, state: StateManager):
+        self.mc = state.model_config
+        self.dc = state.data_config
+        self.engine = PricingEngine(self.mc)
+        self.ped = BuildPED(state)
+        self.day_part_labels = list(self.mc.time_periods_3hr)
+
+    def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        steps = [
+            self.precompute,
+            self.run_windows,
+        ]
+        for step in steps:
+            df = TaskExecutor.run_child_step(step, df)
+        logging.info(f"Backtest windows:\n{df}")
+        return df
+
+    def precompute(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Everything the windows need, computed once for the whole history."""
+        df = df.sort_values('date', kind='stable')
+        day_codes, days = pd.factorize(df['date'], sort=True)
+        day_part = pd.Categorical(df['day_part_3hr'], categories=self.day_part_labels)
+        n_parts = len(self.day_part_labels) + 1
+        day_part_codes = np.where(day_part.codes < 0, n_parts - 1, day_part.codes).astype('int64')
+
+        # Per (day, day part) regression sums, so a training window is a sum over its days
+        x = np.log(df['price_per_mile'].to_numpy(dtype='float64'))
+        y = np.log(df['count_per_mile'].to_numpy(dtype='float64'))
+        x_mean, y_mean = x.mean(), y.mean()
+        x, y = x - x_mean, y - y_mean
+        cell = day_codes * n_parts + day_part_codes
+        n_cells = len(days) * n_parts
+        stats = np.stack([
+            np.bincount(cell, weights=w, minlength=n_cells)
+            for w in [np.ones_like(x), x, y, x * x, x * y, y * y]], axis=-1).reshape(len(days), n_parts, 6)
+
+        return {
+            'days': pd.to_datetime(days),
+            'day_bounds': np.searchsorted(day_codes, np.arange(len(days) + 1)),
+            'price': df['price'].to_numpy(dtype='float64'),
+            'multiplier': self.engine.final_multiplier(df),
+            'day_part_codes': day_part_codes,
+            'stats': stats,
+            'means': (x_mean, y_mean),
+        }
+
+    def fit_elasticity(self, stats: np.ndarray, means: Tuple[float, float]) -> np.ndarray:
+        grouped = pd.DataFrame(stats.sum(axis=0), columns=['n', 'sx', 'sy', 'sxx', 'sxy', 'syy'])
+        elasticity = self.ped.solve_normal_equations(grouped, *means)['elasticity'].to_numpy()
+        return np.nan_to_num(elasticity, nan=0.0)
+
+    def run_windows(self, data: Dict[str, np.ndarray]) -> pd.DataFrame:
+        days, bounds = data['days'], data['day_bounds']
+        train_days, test_days = self.mc.backtest_train_days, self.mc.backtest_test_days
+
+        windows, payloads = [], []
+        for test_start in range(train_days, len(days), test_days):
+            test_end = min(test_start + test_days, len(days))
+            elasticity = self.fit_elasticity(data['stats'][test_start - train_days:test_start], data['means'])
+            windows.append({
+                'window': len(windows),
+                'train_start': days[test_start - train_days],
+                'train_end': days[test_start - 1],
+                'test_start': days[test_start],
+                'test_end': days[test_end - 1],
+                'mean_elasticity': float(elasticity[:-1].mean()),
+            })
+            # The test days are contiguous rows, so a whole window is one task
+            rows = slice(bounds[test_start], bounds[test_end])
+            payloads.append((data['price'][rows], data['multiplier'][rows], data['day_part_codes'][rows], elasticity))
+
+        if not windows:
+            logging.warning(f"Not enough history for a {train_days}+{test_days} day walk-forward split ({len(days)} days)")
+            return pd.DataFrame()
+
+        n_test_days = len(days) - train_days
+        if self.dc.n_workers == 1 or len(payloads) == 1 or n_test_days < MIN_PARALLEL_DAYS:
+            window_results = [simulate_window(payload) for payload in payloads]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.dc.n_workers, len(payloads))) as executor:
+                window_results = list(executor.map(simulate_window, payloads))
+
+        result = pd.concat([pd.DataFrame(windows), pd.DataFrame(window_results)], axis=1)
+        result['revenue_uplift'] = result['dynamic_revenue'] / result['base_revenue'] - 1
+        result['volume_change'] = result['dynamic_volume'] / result['base_volume'] - 1
+        return result
@@ -2,10 +2,14 @@ from __future__ import annotations
 
 import logging
 from typing import Dict
+from typing import List
+from typing import Optional
 
 import pandas as pd
 
 from config.state_init import StateManager
+from src.features.peak_hours import PeakHourIndex
+from src.models.pricing_engine import PricingEngine
 from utils.execution import TaskExecutor
 
 
@@ -14,6 +18,8 @@ class DynamicPricing:
 
     def __init__(self, state: StateManager):
         self.mc = state.model_config
+        self.engine = PricingEngine(self.mc)
+        self.index_path = state.paths.get_path('bound_hours')
 
     def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
         steps = [
@@ -28,6 +34,9 @@ class DynamicPricing:
         logging.info(f"Return difference: {dynamic_profit - base_profit:.2f}")
         return df
 
+    def peak_hours(self, ranking: str = 'max_count_hour', dow: Optional[str] = None) -> List[int]:
+        return PeakHourIndex.hours(PeakHourIndex.read(self.index_path), ranking, dow=dow)
+
     def calculate_surge_multiplier(self, mean_ratio: float) -> float:
         for (lower, upper), multiplier in self.mc.mean_ratio_bins.items():
             if lower <= mean_ratio < upper:
@@ -44,14 +53,15 @@ class DynamicPricing:
         return self.mc.day_parts.get(time_period, 1.0)
 
     def calculate_demand_multiplier(self, row: Dict) -> float:
-        surge_multiplier = self.calculate_surge_multiplier(row['3h_partly_cpm_mean_ratio'])
-        base_multiplier = self.calculate_base_multiplier(row['3h_partly_cpm_max_ratio'])
+        mean_ratio_col, max_ratio_col = self.mc.demand_ratio_columns()
+        surge_multiplier = self.calculate_surge_multiplier(row[mean_ratio_col])
+        base_multiplier = self.calculate_base_multiplier(row[max_ratio_col])
         return max(base_multiplier, surge_multiplier)
 
     def calculate_final_multiplier(self, row: Dict) -> float:
         time_multiplier = self.calculate_time_multiplier(row['day_part_3hr'])
         demand_multiplier = self.calculate_demand_multiplier(row)
-        weekend_multiplier = 1.1 if row['is_weekend'] else 1.0
+        weekend_multiplier = self.mc.weekend_multiplier if row['is_weekend'] else 1.0
         return (time_multiplier + demand_multiplier + weekend_multiplier) / 3
 
     def calculate_dynamic_price(self, row: Dict) -> float:
@@ -59,5 +69,5 @@ class DynamicPricing:
         return row['price'] * final_multiplier
 
     def apply_dynamic_pricing(self, df: pd.DataFrame) -> pd.DataFrame:
-        df['dynamic_price'] = df.apply(self.calculate_dynamic_price, axis=1)
+        df['dynamic_price'] = self.engine.price(df)
         return df
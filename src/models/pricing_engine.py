@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+
+
+def compile_ratio_bins(bins: Dict[Tuple[float, float], float]) -> Tuple[np.ndarray, np.ndarray]:
+    """Compile ``{(lower, upper): multiplier}`` bins into sorted edges and a lookup table.
+
+    ``values[np.searchsorted(edges, x, side='right')]`` reproduces the per-row rule
+    (first bin in dict order with ``lower <= x < upper``, else 1.0). ``values[0]`` and
+    ``values[-1]`` cover everything outside the edges, including NaN.
+    """
+    edges = np.unique(np.array([bound for pair in bins for bound in pair], dtype='float64'))
+    values = np.ones(len(edges) + 1, dtype='float64')
+    for i in range(len(edges) - 1):
+        lower, upper = edges[i], edges[i + 1]
+        for (bin_lower, bin_upper), multiplier in bins.items():
+            if bin_lower <= lower and upper <= bin_upper:
+                values[i + 1] = multiplier
+                break
+    return edges, values
+
+
+@dataclass
+class PricingTables:
+    """ModelConfig pricing rules compiled into flat numpy lookup arrays."""
+    mean_edges: np.ndarray
+    mean_values: np.ndarray
+    max_edges: np.ndarray
+    max_values: np.ndarray
+    day_part_labels: List[str]
+    day_part_values: np.ndarray
+    weekend_multiplier: float
+
+    @classmethod
+    def from_config(cls, mc: ModelConfig) -> PricingTables:
+        mean_edges, mean_values = compile_ratio_bins(mc.mean_ratio_bins)
+        max_edges, max_values = compile_ratio_bins(mc.max_ratio_bins)
+        return cls(
+            mean_edges=mean_edges,
+            mean_values=mean_values,
+            max_edges=max_edges,
+            max_values=max_values,
+            day_part_labels=list(mc.day_parts.keys()),
+            day_part_values=np.array(list(mc.day_parts.values()), dtype='float64'),
+            weekend_multiplier=mc.weekend_multiplier)
+
+    def surge_multiplier(self, mean_ratio) -> np.ndarray:
+        return self.mean_values[np.searchsorted(self.mean_edges, np.asarray(mean_ratio, dtype='float64'), side='right')]
+
+    def base_multiplier(self, max_ratio) -> np.ndarray:
+        return self.max_values[np.searchsorted(self.max_edges, np.asarray(max_ratio, dtype='float64'), side='right')]
+
+    def day_part_codes(self, day_part) -> np.ndarray:
+        """Map day part labels to positions in ``day_part_labels`` (-1 when unknown)."""
+        day_part = pd.Series(day_part)
+        if isinstance(day_part.dtype, pd.CategoricalDtype):
+            lookup = np.array([
+                self.day_part_labels.index(c) if c in self.day_part_labels else -1
+                for c in day_part.cat.categories] + [-1])
+            return lookup[day_part.cat.codes.to_numpy()]
+        return pd.Index(self.day_part_labels).get_indexer(day_part).astype('int64')
+
+    def time_multiplier_from_codes(self, codes: np.ndarray) -> np.ndarray:
+        return np.append(self.day_part_values, 1.0)[codes]
+
+    def time_multiplier(self, day_part) -> np.ndarray:
+        return self.time_multiplier_from_codes(self.day_part_codes(day_part))
+
+    def weekend_multipliers(self, is_weekend) -> np.ndarray:
+        return np.where(np.asarray(is_weekend) != 0, self.weekend_multiplier, 1.0)
+
+    def final_multiplier(self, day_part, is_weekend, mean_ratio, max_ratio) -> np.ndarray:
+        demand_multiplier = np.maximum(self.base_multiplier(max_ratio), self.surge_multiplier(mean_ratio))
+        return (self.time_multiplier(day_part) + demand_multiplier + self.weekend_multipliers(is_weekend)) / 3
+
+
+class PricingEngine:
+    """Columnar dynamic pricing: whole-column multiplier lookups instead of ``df.apply``."""
+
+    def __init__(self, mc: ModelConfig):
+        self.tables = PricingTables.from_config(mc)
+        self.mean_ratio_col, self.max_ratio_col = mc.demand_ratio_columns()
+        self.rows_per_sec = None
+
+    def final_multiplier(self, df: pd.DataFrame) -> np.ndarray:
+        return self.tables.final_multiplier(
+            df['day_part_3hr'], df['is_weekend'],
+            df[self.mean_ratio_col], df[self.max_ratio_col])
+
+    def price(self, df: pd.DataFrame) -> np.ndarray:
+        start_time = time.perf_counter()
+        dynamic_price = df['price'].to_numpy(dtype='float64') * self.final_multiplier(df)
+        duration = time.perf_counter() - start_time
+        self.rows_per_sec = len(df) / duration if duration > 0 else float('inf')
+        logging.info(f"Priced {len(df)} rows in {duration:.3f}s ({self.rows_per_sec:,.0f} rows/sec)")
+        return dynamic_price
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from bisect import bisect_right
+from typing import Dict
+from typing import Sequence
+
+import numpy as np
+
+from config.model import ModelConfig
+from src.models.pricing_engine import PricingTables
+
+
+class QuoteService:
+    """Request-time pricing from precompiled multiplier tables (no pandas in the hot path)."""
+
+    def __init__(self, mc: ModelConfig):
+        self.tables = PricingTables.from_config(mc)
+        self._mean_edges = self.tables.mean_edges.tolist()
+        self._mean_values = self.tables.mean_values.tolist()
+        self._max_edges = self.tables.max_edges.tolist()
+        self._max_values = self.tables.max_values.tolist()
+        self._time_multipliers = dict(zip(self.tables.day_part_labels, self.tables.day_part_values.tolist()))
+        self._weekend_multiplier = self.tables.weekend_multiplier
+
+    def quote(self, price: float, day_part_3hr: str, is_weekend: bool, mean_ratio: float, max_ratio: float) -> float:
+        surge_multiplier = self._mean_values[bisect_right(self._mean_edges, mean_ratio)]
+        base_multiplier = self._max_values[bisect_right(self._max_edges, max_ratio)]
+        demand_multiplier = base_multiplier if base_multiplier > surge_multiplier else surge_multiplier
+        time_multiplier = self._time_multipliers.get(day_part_3hr, 1.0)
+        weekend_multiplier = self._weekend_multiplier if is_weekend else 1.0
+        return price * ((time_multiplier + demand_multiplier + weekend_multiplier) / 3)
+
+    def quote_batch(
+            self, prices: Sequence[float], day_parts: Sequence[str], is_weekend: Sequence[bool],
+            mean_ratios: Sequence[float], max_ratios: Sequence[float]) -> np.ndarray:
+        time_multiplier = np.array([self._time_multipliers.get(part, 1.0) for part in day_parts], dtype='float64')
+        demand_multiplier = np.maximum(
+            self.tables.base_multiplier(max_ratios), self.tables.surge_multiplier(mean_ratios))
+        weekend_multiplier = self.tables.weekend_multipliers(is_weekend)
+        return np.asarray(prices, dtype='float64') * ((time_multiplier + demand_multiplier + weekend_multiplier) / 3)
+
+
+def measure_latency(service: QuoteService, n_requests: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Time single quotes on random requests and return latency percentiles in microseconds."""
+    rng = random.Random(seed)
+    day_parts = list(service._time_multipliers)
+    requests = [
+        (rng.uniform(2.5, 60.0), rng.choice(day_parts), rng.random() < 2 / 7, rng.random() * 0.3, rng.random())
+        for _ in range(n_requests)]
+
+    timings = np.empty(n_requests, dtype='float64')
+    for i, request in enumerate(requests):
+        start_time = time.perf_counter_ns()
+        service.quote(*request)
+        timings[i] = time.perf_counter_ns() - start_time
+
+    timings /= 1_000
+    latency = {
+        'n_requests': n_requests,
+        'mean_us': float(timings.mean()),
+        'p50_us': float(np.percentile(timings, 50)),
+        'p99_us': float(np.percentile(timings, 99)),
+        'p999_us': float(np.percentile(timings, 99.9)),
+        'max_us': float(timings.max()),
+    }
+    logging.info(f"Quote latency over {n_requests} requests: p50 {latency['p50_us']:.2f}us, p99 {latency['p99_us']:.2f}us")
+    return latency
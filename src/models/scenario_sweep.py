@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import itertools
+import logging
+from dataclasses import replace
+from pprint import pformat
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+from config.state_init import StateManager
+from src.models.pricing_engine import PricingTables
+
+
+def build_config_grid(base: ModelConfig, **variants: list) -> List[ModelConfig]:
+    """Cartesian product of ModelConfig field variants, e.g. ``weekend_multiplier=[1.0, 1.1, 1.2]``."""
+    names = list(variants)
+    return [replace(base, **dict(zip(names, combo))) for combo in itertools.product(*variants.values())]
+
+
+class ScenarioSweep:
+    """Evaluate a grid of ModelConfig variants against one features frame in a single broadcasted pass."""
+
+    def __init__(self, state: StateManager, configs: List[ModelConfig], chunk_size: int = 250_000):
+        self.configs = configs
+        self.mean_ratio_col, self.max_ratio_col = state.model_config.demand_ratio_columns()
+        self.chunk_size = chunk_size
+        self.tables = [PricingTables.from_config(mc) for mc in configs]
+        self._compile_grid()
+
+    def _compile_grid(self):
+        """Stack every config's lookup tables onto shared (union) edges and labels."""
+        self.mean_edges = np.unique(np.concatenate([t.mean_edges for t in self.tables]))
+        self.max_edges = np.unique(np.concatenate([t.max_edges for t in self.tables]))
+        self.day_part_labels = list(dict.fromkeys(label for t in self.tables for label in t.day_part_labels))
+
+        # Union interval j starts at edges[j - 1]; its value is each config's lookup at that point
+        self.mean_values = np.stack([
+            t.mean_values[np.searchsorted(t.mean_edges, np.append(-np.inf, self.mean_edges), side='right')]
+            for t in self.tables])
+        self.max_values = np.stack([
+            t.max_values[np.searchsorted(t.max_edges, np.append(-np.inf, self.max_edges), side='right')]
+            for t in self.tables])
+        self.time_values = np.stack([
+            np.append(t.time_multiplier(self.day_part_labels), 1.0) for t in self.tables])
+        self.weekend_values = np.stack([[1.0, t.weekend_multiplier] for t in self.tables])
+
+    def pipeline(self, df: pd.DataFrame) -> pd.DataFrame:
+        logging.debug(f"Sweeping {len(self.configs)} configs:\n{pformat(dict(enumerate(self.configs)))}")
+
+        # Shared columns are read and binned once, not once per config
+        price = df['price'].to_numpy(dtype='float64')
+        mean_idx = np.searchsorted(self.mean_edges, df[self.mean_ratio_col].to_numpy(dtype='float64'), side='right')
+        max_idx = np.searchsorted(self.max_edges, df[self.max_ratio_col].to_numpy(dtype='float64'), side='right')
+        day_part = pd.Categorical(df['day_part_3hr'], categories=self.day_part_labels)
+        day_part_idx = np.where(day_part.codes < 0, len(self.day_part_labels), day_part.codes)
+        weekend_idx = (df['is_weekend'].to_numpy() != 0).astype('int64')
+        date_codes, dates = pd.factorize(df['date'], sort=True)
+
+        groupings = {
+            'total': (np.zeros(len(df), dtype='int64'), ['all']),
+            'day_part_3hr': (day_part_idx, self.day_part_labels + ['Unknown']),
+            'date': (date_codes, [str(d.date()) for d in pd.to_datetime(dates)]),
+        }
+        n_configs = len(self.configs)
+        dynamic_revenue = {level: np.zeros(n_configs * len(labels)) for level, (_, labels) in groupings.items()}
+        config_offsets = np.arange(n_configs)[:, None]
+
+        for start in range(0, len(df), self.chunk_size):
+            rows = slice(start, start + self.chunk_size)
+            demand_multiplier = np.maximum(self.max_values[:, max_idx[rows]], self.mean_values[:, mean_idx[rows]])
+            final_multiplier = (self.time_values[:, day_part_idx[rows]] + demand_multiplier + self.weekend_values[:, weekend_idx[rows]]) / 3
+            dynamic_price = price[rows] * final_multiplier
+            for level, (codes, labels) in groupings.items():
+                keys = config_offsets * len(labels) + codes[rows]
+                dynamic_revenue[level] += np.bincount(keys.ravel(), weights=dynamic_price.ravel(), minlength=n_configs * len(labels))
+
+        frames = []
+        for level, (codes, labels) in groupings.items():
+            base_revenue = np.bincount(codes, weights=price, minlength=len(labels))
+            frames.append(pd.DataFrame({
+                'config_id': np.repeat(np.arange(n_configs), len(labels)),
+                'level': level,
+                'group': np.tile(labels, n_configs),
+                'base_revenue': np.tile(base_revenue, n_configs),
+                'dynamic_revenue': dynamic_revenue[level],
+            }))
+        result = pd.concat(frames, ignore_index=True)
+        result['revenue_difference'] = result['dynamic_revenue'] - result['base_revenue']
+        result = result[(result['level'] != 'day_part_3hr') | (result['base_revenue'] != 0)].reset_index(drop=True)
+
+        totals = result[result['level'] == 'total'].sort_values('dynamic_revenue', ascending=False)
+        logging.info(f"Sweep totals (best first):\n{totals[['config_id', 'base_revenue', 'dynamic_revenue', 'revenue_difference']].head(10)}")
+        return result
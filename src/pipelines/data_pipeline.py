@@ -1,27 +1,104 @@
 from __future__ import annotations
 
+from typing import List
+
+from config.model import ModelConfig
 from config.state_init import StateManager
-from src.data.make_dataset import MakeDataset
+from src.data.make_dataset import RawIngest
 from src.data.process import InitialProcessor
 from src.features.bound_analysis import AnalyseBounds
 from src.features.build_features import BuildAnalysisFeatures
 from src.features.build_model_features import BuildModelFeatures
+from src.features.build_ped import BuildPED
+from src.features.peak_hours import PeakHourIndex
+from src.features.rollup_cube import BuildRollupCube
+from src.features.sampling import TripSampler
+from src.features.zones import BuildZoneDemand
+from src.models.backtest import PricingBacktest
 from src.models.pricing import DynamicPricing
+from src.models.scenario_sweep import ScenarioSweep
 from utils.execution import TaskExecutor
+from utils.feature_cache import FeatureCache
 
 
 class DataPipeline:
     def __init__(self, state: StateManager, exe: TaskExecutor):
         self.state = state
         self.exe = exe
+        self.cache = self.feature_cache()
 
     def main(self):
         steps = [
-            (MakeDataset().pipeline, 'raw', 'sdo'),
-            (InitialProcessor().pipeline, 'sdo', 'process1'),
-            (BuildAnalysisFeatures(self.state).pipeline, 'process1', 'features1'),
+            self.ingest_step(),
+            (InitialProcessor(self.state.data_config.quantile_sketch_k).pipeline, 'sdo', 'process1'),
+            *self.sampling_steps(),
+            (BuildAnalysisFeatures(self.state).pipeline, self.analysis_input(), 'features1'),
+            (BuildModelFeatures(self.state, self.cache).pipeline, 'process1', 'features2'),
+            (PeakHourIndex(self.state).pipeline, None, None),
+            (BuildRollupCube(self.state).pipeline, 'features2', 'rollup_cube'),
+            (BuildZoneDemand(self.state).pipeline, 'features2', 'zone_demand'),
             (AnalyseBounds(self.state).pipeline, 'features1', None),
-            (BuildModelFeatures().pipeline, 'process1', 'features2'),
-            (DynamicPricing(self.state).pipeline, 'features2', 'result'),
+            (BuildPED(self.state).pipeline, 'features2', 'ped'),
+            self.pricing_step(),
+        ]
+        self.exe._execute_steps(steps, stage="parent")
+
+    def feature_cache(self):
+        """Cache for the model builder's steps, keyed on the configs so a config change misses"""
+        dc = self.state.data_config
+        if not dc.feature_cache:
+            return None
+        return FeatureCache(
+            self.state.paths.get_path('feature_cache'),
+            max_memory_mb=dc.feature_cache_memory_mb,
+            max_disk_mb=dc.feature_cache_disk_mb,
+            salt=repr((dc, self.state.model_config)),
+            persist=dc.feature_cache_persist)
+
+    def ingest_step(self):
+        ingest = RawIngest(self.state)
+        if self.state.data_config.stream_ingest:
+            return (ingest.stream, None, None)
+        return (ingest.pipeline, None, 'sdo')
+
+    def sampling_steps(self):
+        """Streamed analysis sample of process1, unless the builder slices the 'last' rows itself"""
+        if self.state.data_config.sample_method == 'last':
+            return []
+        return [(TripSampler(self.state).pipeline, None, 'analysis_sample')]
+
+    def analysis_input(self):
+        return 'process1' if self.state.data_config.sample_method == 'last' else 'analysis_sample'
+
+    def pricing_step(self):
+        backend = self.state.model_config.pricing_backend
+        if backend == 'pandas':
+            return (DynamicPricing(self.state).pipeline, 'features2', 'result')
+        if backend == 'postgres':
+            from src.db.config import DatabaseState
+            from src.db.connection import DatabaseConnection
+            from src.db.pipeline import SQLPricingPipeline
+            db_state = DatabaseState()
+            # features2 is copied into features_table first, unless that table is kept up to date elsewhere
+            features = 'features2' if db_state.load_features else None
+            return (SQLPricingPipeline(db_state, DatabaseConnection(db_state), self.state.model_config).pipeline, features, None)
+        raise ValueError(f'Unknown pricing backend: {backend}')
+
+    def backtest(self):
+        steps = [
+            (PricingBacktest(self.state).pipeline, 'features2', 'backtest'),
+        ]
+        self.exe._execute_steps(steps, stage="parent")
+
+    def quick_look(self):
+        """Sampled trip means with confidence intervals, without building any features"""
+        steps = [
+            (TripSampler(self.state).quick_look, None, 'quick_look'),
+        ]
+        self.exe._execute_steps(steps, stage="parent")
+
+    def sweep(self, configs: List[ModelConfig]):
+        steps = [
+            (ScenarioSweep(self.state, configs).pipeline, 'features2', 'sweep'),
         ]
         self.exe._execute_steps(steps, stage="parent")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import src.models.backtest as backtest
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.models.backtest import PricingBacktest
+
+
+def history(n_days=60, rows_per_day=50):
+    rng = np.random.default_rng(0)
+    n_parts = len(ModelConfig().time_periods_3hr) + 1
+    n = n_days * rows_per_day
+    return {
+        'days': pd.date_range('2024-01-01', periods=n_days),
+        'day_bounds': np.arange(n_days + 1) * rows_per_day,
+        'price': rng.uniform(5, 50, n),
+        'multiplier': rng.uniform(0.8, 1.5, n),
+        'day_part_codes': rng.integers(0, n_parts - 1, n),
+        'stats': np.abs(rng.normal(1, 0.1, (n_days, n_parts, 6))) * [20, 1, 1, 5, -1, 5],
+        'means': (0.0, 0.0),
+    }
+
+
+def run(n_workers):
+    state = SimpleNamespace(data_config=DataConfig(n_workers=n_workers), model_config=ModelConfig())
+    return PricingBacktest(state).run_windows(history())
+
+
+def test_windows_match_per_day_sums():
+    data = history()
+    result = run(1)
+    assert len(result) == 5
+    first = result.iloc[0]
+    rows = slice(data['day_bounds'][28], data['day_bounds'][35])
+    assert first['base_volume'] == 7 * 50
+    assert np.isclose(first['base_revenue'], data['price'][rows].sum())
+
+
+def test_parallel_windows_match_serial(monkeypatch):
+    serial = run(1)
+    monkeypatch.setattr(backtest, 'MIN_PARALLEL_DAYS', 0)
+    pd.testing.assert_frame_equal(run(2), serial)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from functools import wraps
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.features.build_features import BuildAnalysisFeatures
+from src.features.validity import VALID_COLUMN
+
+
+def trips(n=20_000):
+    rng = np.random.default_rng(0)
+    ts = pd.Timestamp('2014-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 10 * 86_400, n)), unit='s')
+    df = pd.DataFrame({
+        'timestamp': ts, 'price': rng.uniform(1, 60, n), 'count': rng.integers(1, 5, n).astype(float),
+        'pickup_latitude': rng.uniform(40.6, 40.9, n), 'pickup_longitude': rng.uniform(-74.1, -73.8, n),
+        'dropoff_latitude': rng.uniform(40.6, 40.9, n), 'dropoff_longitude': rng.uniform(-74.1, -73.8, n)})
+    # Zero-distance trips give infinite per-mile features, which the filters drop
+    zero = rng.integers(0, n, 500)
+    df.loc[zero, 'dropoff_latitude'] = df.loc[zero, 'pickup_latitude']
+    df.loc[zero, 'dropoff_longitude'] = df.loc[zero, 'pickup_longitude']
+    return df
+
+
+def builder(tmp_path, **data_config):
+    state = SimpleNamespace(
+        data_config=DataConfig(feature_cache=False, **data_config), model_config=ModelConfig(),
+        paths=SimpleNamespace(get_path=lambda key: tmp_path / key))
+    return BuildAnalysisFeatures(state)
+
+
+def test_features_are_built_on_the_sample_only(tmp_path):
+    features = builder(tmp_path)
+    seen = []
+    distance = features.build_haversine_distance
+
+    @wraps(distance)
+    def spy(df):
+        seen.append(len(df))
+        return distance(df)
+    features.build_haversine_distance = spy
+    df = trips()
+    out = features.pipeline(df.copy())
+    assert seen == [len(df) // 10]
+    assert VALID_COLUMN not in out.columns
+
+
+@pytest.mark.parametrize('compact_after', [[], ['build_bound_features']])
+def test_masked_build_matches_eager_filters(tmp_path, compact_after):
+    eager = builder(tmp_path, validity_mask=False).pipeline(trips())
+    masked = builder(tmp_path, compact_after=compact_after).pipeline(trips())
+    pd.testing.assert_frame_equal(masked.reset_index(drop=True), eager.reset_index(drop=True), check_exact=False, rtol=1e-6)
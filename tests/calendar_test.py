@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.model import ModelConfig
+from src.features.calendar import CALENDAR_COLUMNS
+from src.features.calendar import CalendarDimension
+
+
+def row_wise_calendar(df):
+    """Datetime features as ``build_dt_features`` derived them per row before the calendar dimension"""
+    df['hour'] = df['timestamp'].dt.hour.astype('int32')
+    df['date'] = df['timestamp'].dt.date.astype('datetime64[ns]')
+    df['week'] = df['timestamp'].dt.isocalendar().week.astype('UInt32')
+    df['month'] = df['timestamp'].dt.month.astype('int32')
+    df['dow'] = df['timestamp'].dt.day_name().str[:3]
+    df['dow_num'] = df['timestamp'].dt.dayofweek
+    df['date_hour'] = df['timestamp'].dt.strftime('%Y-%m-%d %H').astype('datetime64[ns]')
+    df['is_weekend'] = df['dow_num'].isin([5, 6]).astype(int)
+    df['day_part_6hr'] = pd.cut(
+        df['hour'], bins=[-1, 6, 12, 18, 23],
+        labels=['Night', 'Morning', 'Afternoon', 'Evening'])
+    df['day_part_3hr'] = pd.cut(
+        df['hour'], bins=[-1, 3, 6, 9, 12, 15, 18, 21, 23],
+        labels=['Night', 'Early Morning', 'Morning', 'Early Afternoon', 'Afternoon', 'Early Evening', 'Evening', 'Early Night'])
+    return df
+
+
+def trips(span_days, n=5_000):
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(0, span_days * 86_400, n)
+    return pd.DataFrame({'timestamp': pd.Timestamp('2014-12-26') + pd.to_timedelta(seconds, unit='s')})
+
+
+# Two weeks are a dense hour range; six years of trips take the sparse (unique hours) path
+@pytest.mark.parametrize('span_days', [14, 6 * 365])
+def test_calendar_matches_row_wise_features(span_days):
+    df = trips(span_days)
+    expected = row_wise_calendar(df.copy())
+    actual = CalendarDimension(ModelConfig()).attach(df.copy())
+    for col in CALENDAR_COLUMNS:
+        assert actual[col].astype(object).tolist() == expected[col].astype(object).tolist(), col
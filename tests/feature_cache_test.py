@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pandas as pd
+
+import utils.feature_cache as feature_cache
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.features.build_features import BuildAnalysisFeatures
+from src.features.build_model_features import BuildModelFeatures
+from utils.feature_cache import FeatureCache
+
+
+def builders(tmp_path):
+    state = SimpleNamespace(
+        data_config=DataConfig(feature_cache=False), model_config=ModelConfig(),
+        paths=SimpleNamespace(get_path=lambda key: tmp_path / key))
+    return BuildAnalysisFeatures(state), BuildModelFeatures(state)
+
+
+def test_inherited_steps_share_keys_and_own_steps_do_not(tmp_path):
+    cache = FeatureCache(tmp_path / 'cache')
+    analysis, model = builders(tmp_path)
+    assert cache.derive('root', analysis.build_count_per_mile) == cache.derive('root', model.build_count_per_mile)
+    assert cache.derive('root', analysis.build_demand_features) != cache.derive('root', model.build_demand_features)
+
+
+def test_code_change_invalidates_keys(tmp_path, monkeypatch):
+    cache = FeatureCache(tmp_path / 'cache')
+    analysis, _ = builders(tmp_path)
+    before = cache.derive('root', analysis.build_haversine_distance)
+    monkeypatch.setattr(feature_cache, 'code_version', lambda: 'edited')
+    assert cache.derive('root', analysis.build_haversine_distance) != before
+
+
+def test_disk_is_used_only_when_persisting(tmp_path):
+    frame = pd.DataFrame({'price': [1.0, 2.0]})
+    FeatureCache(tmp_path / 'cache').put('key', frame)
+    assert not (tmp_path / 'cache').exists()
+
+    FeatureCache(tmp_path / 'cache', persist=True).put('key', frame)
+    assert FeatureCache(tmp_path / 'cache').get('key') is None
+    pd.testing.assert_frame_equal(FeatureCache(tmp_path / 'cache', persist=True).get('key'), frame)
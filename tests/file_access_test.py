@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from utils.file_access import FileAccess
+
+N_DATES = 1_500  # more than pyarrow's default limit of 1024 partitions and open files
+
+
+def trips(n=6_000, seed=0):
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, N_DATES, n)
+    return pd.DataFrame({
+        'uid': np.arange(n) + seed * n,
+        'timestamp': pd.Timestamp('2009-01-01') + pd.to_timedelta(days, unit='D'),
+        'price': rng.random(n),
+    })
+
+
+def test_save_dataset_writes_every_date(tmp_path):
+    df = trips().sort_values('timestamp', kind='stable', ignore_index=True)
+    FileAccess.save_dataset(df, tmp_path / 'trips.parquet')
+    loaded = FileAccess.load_dataset(tmp_path / 'trips.parquet')
+    assert len(list((tmp_path / 'trips.parquet').glob('*/*/*'))) == df['timestamp'].nunique()
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+
+
+def test_unsorted_chunk_stream_writes_every_date(tmp_path):
+    chunks = [trips(seed=seed) for seed in range(3)]
+    FileAccess.save_chunks(iter(chunks), tmp_path / 'trips.parquet', partitioned=True)
+    loaded = FileAccess.load_dataset(tmp_path / 'trips.parquet', ('2010-01-01', '2010-12-31'))
+    expected = pd.concat(chunks, ignore_index=True)
+    expected = expected[expected['timestamp'].dt.year == 2010]
+    assert sorted(loaded['uid']) == sorted(expected['uid'])
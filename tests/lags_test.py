@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.lags import GroupedLags
+
+LAGS = [1, 3, 6]
+COLUMNS = {'count_per_mile': 'cpm', 'price_per_mile': 'ppm'}
+
+
+def trips(n=3_000, sorted_keys=False):
+    rng = np.random.default_rng(0)
+    dates = rng.choice(pd.date_range('2015-01-01', periods=40), n)
+    df = pd.DataFrame({
+        'date': np.sort(dates) if sorted_keys else dates,
+        'count_per_mile': rng.random(n),
+        'price_per_mile': rng.random(n),
+    })
+    df.loc[rng.integers(0, n, 100), 'count_per_mile'] = np.nan
+    df.loc[rng.integers(0, n, 20), 'date'] = pd.NaT
+    return df
+
+
+def expected_lags(df):
+    grouped = df.groupby('date')[list(COLUMNS)]
+    return np.column_stack([grouped.shift(lag)[col].to_numpy() for lag in LAGS for col in COLUMNS])
+
+
+@pytest.mark.parametrize('sorted_keys', [True, False])
+def test_shift_matches_groupby_shift(sorted_keys):
+    df = trips(sorted_keys=sorted_keys)
+    block = GroupedLags(df, 'date').shift(df[list(COLUMNS)].to_numpy(), LAGS)
+    np.testing.assert_array_equal(block, expected_lags(df))
+
+
+def test_masked_rows_match_groupby_shift_on_kept_rows():
+    df = trips()
+    mask = np.random.default_rng(1).random(len(df)) > 0.3
+    block = GroupedLags(df, 'date', mask).shift(df[list(COLUMNS)].to_numpy(), LAGS)
+    np.testing.assert_array_equal(block[mask], expected_lags(df[mask]))
+
+
+def test_apply_forward_fills_like_dataframe_ffill():
+    df = trips()
+    out = GroupedLags(df, 'date').apply(df.copy(), COLUMNS, LAGS)
+    names = [f'{prefix}_lag_{lag}' for lag in LAGS for prefix in COLUMNS.values()]
+    expected = pd.DataFrame(expected_lags(df), columns=names).ffill()
+    pd.testing.assert_frame_equal(out[names].reset_index(drop=True), expected)
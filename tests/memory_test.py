@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+import src.features.memory as memory
+from src.features.memory import MemoryReport
+from src.features.memory import default_frame_bytes
+from src.features.memory import frame_bytes
+
+
+def trips(n=10_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'price': rng.random(n), 'dow': rng.choice(['Mon', 'Tue', 'Sat'], n)})
+
+
+def test_sizes_match_whole_frame_measurement():
+    report = MemoryReport('test')
+    df = report.record('load', trips())
+    _, actual, default = report.steps[-1][:3]
+    assert df['price'].dtype == 'float32' and isinstance(df['dow'].dtype, pd.CategoricalDtype)
+    assert actual == frame_bytes(df)
+    assert default == default_frame_bytes(df)
+
+
+def test_columns_are_sized_once(monkeypatch):
+    report = MemoryReport('test')
+    measured = []
+    sized = memory.column_bytes
+    monkeypatch.setattr(memory, 'column_bytes', lambda values: measured.append(values.name) or sized(values))
+    df = report.record('load', trips())
+    df['fare'] = df['price'] * 2.0
+    report.record('fare', df)
+    assert measured == ['price', 'dow', 'fare']
+
+
+def test_step_peak_counts_temporaries():
+    report = MemoryReport('test')
+
+    def wide_temporary(df):
+        scratch = np.ones((len(df), 100))
+        df['total'] = scratch.sum(axis=1)
+        return df
+
+    report.track(wide_temporary)(trips())
+    step, _, _, peak = report.steps[-1]
+    assert step == 'wide_temporary'
+    assert peak >= 10_000 * 100 * 8
+    assert 'peak_mb' in report.summary()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import src.features.partitions as partitions
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.features.build_model_features import BuildModelFeatures
+
+
+def store(tmp_path, **data_config):
+    state = SimpleNamespace(
+        data_config=DataConfig(incremental=True, feature_cache=False, **data_config), model_config=ModelConfig(),
+        paths=SimpleNamespace(get_path=lambda key: tmp_path / key))
+    builder = BuildModelFeatures(state)
+    return builder.partitions, [builder.build_dt_features, builder.build_haversine_distance]
+
+
+def test_data_config_change_invalidates_partitions(tmp_path):
+    default, steps = store(tmp_path)
+    changed, _ = store(tmp_path, distance_method='equirectangular')
+    assert default.steps_key(steps) != changed.steps_key(steps)
+
+
+def test_code_change_invalidates_partitions(tmp_path, monkeypatch):
+    default, steps = store(tmp_path)
+    before = default.steps_key(steps)
+    monkeypatch.setattr(partitions, 'code_version', lambda: 'edited')
+    assert default.steps_key(steps) != before
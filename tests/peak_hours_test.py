@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import src.features.peak_hours as peak_hours
+from config.data import DataConfig
+from src.features.peak_hours import PeakHourIndex
+
+
+def trips(start='2015-03-02', days=14, n=4_000, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days * 86_400, n)), unit='s')
+    return pd.DataFrame({
+        'date': ts.normalize(), 'hour': ts.hour.astype('int32'),
+        'price_per_mile': rng.uniform(1, 10, n), 'count_per_mile': rng.uniform(0.1, 2, n)})
+
+
+def index(tmp_path, **data_config):
+    paths = {'features2': tmp_path / 'features2.parquet', 'hourly_agg': tmp_path / 'hourly.parquet', 'bound_hours': tmp_path / 'bound_hours.json'}
+    state = SimpleNamespace(data_config=DataConfig(**data_config), paths=SimpleNamespace(get_path=paths.get))
+    return PeakHourIndex(state)
+
+
+def aggregated_rows(peaks, monkeypatch):
+    rows = []
+    aggregate = peaks.aggregate_hours
+    monkeypatch.setattr(peaks, 'aggregate_hours', lambda df: rows.append(len(df)) or aggregate(df))
+    return rows
+
+
+def test_only_new_and_changed_dates_are_aggregated(tmp_path, monkeypatch):
+    first = trips()
+    index(tmp_path).update_hourly_aggregates(first)
+
+    # Two new days, and an earlier day's prices rewritten
+    later = pd.concat([first, trips('2015-03-16', days=2, seed=1)], ignore_index=True)
+    rewritten = later['date'] == pd.Timestamp('2015-03-05')
+    later.loc[rewritten, 'price_per_mile'] *= 2
+    peaks = index(tmp_path)
+    rows = aggregated_rows(peaks, monkeypatch)
+    hourly = peaks.update_hourly_aggregates(later)
+    assert rows == [int((rewritten | (later['date'] >= pd.Timestamp('2015-03-16'))).sum())]
+    pd.testing.assert_frame_equal(hourly, peaks.aggregate_hours(later))
+
+
+def test_dropped_dates_leave_the_store(tmp_path):
+    df = trips()
+    index(tmp_path).update_hourly_aggregates(df)
+    kept = df[df['date'] > pd.Timestamp('2015-03-03')].reset_index(drop=True)
+    peaks = index(tmp_path)
+    pd.testing.assert_frame_equal(peaks.update_hourly_aggregates(kept), peaks.aggregate_hours(kept))
+
+
+def test_code_change_rebuilds_every_date(tmp_path, monkeypatch):
+    df = trips()
+    index(tmp_path).update_hourly_aggregates(df)
+    monkeypatch.setattr(peak_hours, 'code_version', lambda: 'edited')
+    peaks = index(tmp_path)
+    rows = aggregated_rows(peaks, monkeypatch)
+    peaks.update_hourly_aggregates(df)
+    assert rows == [len(df)]
+
+
+def test_sparse_groups_list_only_hours_with_trips(tmp_path):
+    df = trips()
+    quiet = pd.DataFrame({
+        'date': pd.Timestamp('2015-04-01'), 'hour': np.array([2, 9, 9, 17], dtype='int32'),
+        'price_per_mile': [3.0, 1.0, 2.0, 8.0], 'count_per_mile': [1.0, 1.0, 1.0, 1.0]})
+    df = pd.concat([df, quiet], ignore_index=True)
+    peaks = index(tmp_path, peak_hours_k=12)
+    ranked = peaks.build_index(peaks.aggregate_hours(df))
+    assert ranked['by_week']['2015-W14'] == {
+        'max_ppm_hour': [17, 2, 9], 'min_ppm_hour': [9, 2, 17], 'max_count_hour': [9, 2, 17], 'min_count_hour': [2, 17, 9]}
+    assert len(ranked['max_count_hour']) == 12
+
+
+def test_pipeline_reads_only_source_columns(tmp_path):
+    df = trips().assign(extra=1.0)
+    df.to_parquet(tmp_path / 'features2.parquet')
+    peaks = index(tmp_path)
+    ranked = peaks.pipeline()
+    assert ranked == peaks.build_index(peaks.aggregate_hours(df))
+    assert (tmp_path / 'bound_hours.json').exists()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from config.model import ModelConfig
+from src.models.pricing import DynamicPricing
+
+
+def trips(mc, n=2_000):
+    rng = np.random.default_rng(0)
+    mean_col, max_col = mc.demand_ratio_columns()
+    labels = list(mc.day_parts) + ['Unknown']
+    return pd.DataFrame({
+        'price': rng.uniform(2, 80, n),
+        'day_part_3hr': rng.choice(labels, n),
+        'is_weekend': rng.integers(0, 2, n),
+        # Include values on the bin edges, outside every bin and NaN
+        mean_col: np.r_[rng.uniform(-0.05, 0.3, n - 4), 0.015, 0.05, 5.0, np.nan],
+        max_col: np.r_[rng.uniform(-0.05, 1.2, n - 4), 0.075, 0.25, 1.0, np.nan],
+    })
+
+
+def test_engine_matches_row_wise_pricing():
+    mc = ModelConfig()
+    pricing = DynamicPricing(SimpleNamespace(model_config=mc, paths=SimpleNamespace(get_path=lambda key: key)))
+    df = trips(mc)
+    expected = df.apply(pricing.calculate_dynamic_price, axis=1).to_numpy()
+    np.testing.assert_array_equal(pricing.engine.price(df), expected)
+
+
+def test_engine_matches_row_wise_pricing_for_categorical_day_parts():
+    mc = ModelConfig()
+    pricing = DynamicPricing(SimpleNamespace(model_config=mc, paths=SimpleNamespace(get_path=lambda key: key)))
+    df = trips(mc)
+    expected = df.apply(pricing.calculate_dynamic_price, axis=1).to_numpy()
+    df['day_part_3hr'] = df['day_part_3hr'].astype('category')
+    np.testing.assert_array_equal(pricing.engine.price(df), expected)
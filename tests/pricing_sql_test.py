@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from config.model import ModelConfig
+from src.db.pricing_sql import PricingSQLCompiler
+
+
+def test_recreated_relations_carry_current_rules():
+    compiler = PricingSQLCompiler(ModelConfig(weekend_multiplier=1.5))
+    table = compiler.create_table('features', 'pricing')
+    view = compiler.materialized_view('features', 'pricing')
+    for statement in [table, view]:
+        assert 'IF NOT EXISTS' not in statement
+        assert '1.5::float8' in statement
+
+
+def test_drop_relation_handles_tables_and_materialized_views():
+    drop = PricingSQLCompiler(ModelConfig()).drop_relation("o'pricing")
+    assert "to_regclass('o''pricing')" in drop
+    assert "kind = 'm' THEN EXECUTE 'DROP MATERIALIZED VIEW ' || 'o''pricing'" in drop
+    assert "kind IN ('r', 'p') THEN EXECUTE 'DROP TABLE ' || 'o''pricing'" in drop
+    assert drop.startswith('DO $$') and drop.endswith('END $$;')
+
+
+def test_features_table_load_statements_quote_columns():
+    compiler = PricingSQLCompiler(ModelConfig())
+    create = compiler.features_table('trip_features', [('price', 'FLOAT'), ('3h_partly_cpm_mean_ratio', 'FLOAT')])
+    assert create == 'CREATE TABLE trip_features ("price" FLOAT, "3h_partly_cpm_mean_ratio" FLOAT);'
+    copy = compiler.copy_rows('trip_features', ['price', 'is_weekend'])
+    assert copy == 'COPY trip_features ("price", "is_weekend") FROM STDIN WITH (FORMAT csv);'
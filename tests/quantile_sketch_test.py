@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from utils.quantile_sketch import QuantileSketch
+from utils.quantile_sketch import quantiles
+
+Q = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def rank_errors(values, estimates):
+    """Distance between each estimate's true rank and the requested quantile"""
+    ranks = np.searchsorted(np.sort(values), estimates, side='left') / len(values)
+    return np.abs(ranks - np.asarray(Q))
+
+
+@pytest.mark.parametrize('k', [200, 1000])
+def test_rank_error_within_bound(k):
+    values = np.random.default_rng(0).lognormal(size=300_000)
+    sketch = QuantileSketch.from_values(values, k)
+    assert rank_errors(values, sketch.quantile(Q)).max() <= sketch.rank_error
+
+
+@pytest.mark.parametrize('k', [200, 1000])
+def test_merged_shards_within_bound(k):
+    values = np.random.default_rng(1).exponential(size=300_000)
+    shards = np.array_split(values, 37)
+    sketch = QuantileSketch.from_chunks(shards, k)
+    assert sketch.n == len(values)
+    assert rank_errors(values, sketch.quantile(Q)).max() <= sketch.rank_error
+
+
+def test_exact_until_first_compaction():
+    values = np.random.default_rng(2).normal(size=150)
+    values[::10] = np.nan
+    np.testing.assert_allclose(quantiles(values, Q, k=200), quantiles(values, Q))
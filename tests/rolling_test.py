@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.rolling import ROLLING_STATS
+from src.features.rolling import RollingWindow
+
+COLUMNS = ['cpm_ratio', 'ppm_ratio']
+
+
+def trips(n=2_000):
+    """Sorted timestamps with repeated times, multi-hour gaps and a missing day, plus NaN values"""
+    rng = np.random.default_rng(0)
+    steps = rng.choice([0, 60, 600, 3_600, 4 * 3_600, 9 * 3_600], n, p=[0.1, 0.3, 0.4, 0.1, 0.07, 0.03])
+    steps[n // 2] = 2 * 86_400
+    timestamps = pd.Timestamp('2015-01-01') + pd.to_timedelta(np.cumsum(steps), unit='s')
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'date': timestamps.normalize(),
+        'cpm_ratio': rng.random(n),
+        'ppm_ratio': rng.normal(size=n),
+    })
+    df.loc[rng.random(n) < 0.2, 'cpm_ratio'] = np.nan
+    df.loc[rng.random(n) < 0.05, 'ppm_ratio'] = np.nan
+    return df
+
+
+def expected_rolling(df, stat, by=None):
+    if by is None:
+        return df.rolling('6h', on='timestamp')[COLUMNS].agg(stat)[COLUMNS].to_numpy()
+    parts = [group.rolling('6h', on='timestamp')[COLUMNS].agg(stat)[COLUMNS] for _, group in df.groupby(by, sort=False)]
+    return pd.concat(parts).loc[df.index].to_numpy()
+
+
+@pytest.mark.parametrize('by', [None, 'date'])
+@pytest.mark.parametrize('stat', ROLLING_STATS)
+def test_matches_pandas_time_rolling(stat, by):
+    df = trips()
+    result = RollingWindow(df, '6h', by=by).aggregate(df[COLUMNS].to_numpy(), stat)
+    np.testing.assert_allclose(result, expected_rolling(df, stat, by), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('by', [None, 'date'])
+@pytest.mark.parametrize('stat', ROLLING_STATS)
+def test_shuffled_rows_match_pandas_on_sorted_rows(stat, by):
+    shuffled = trips().sample(frac=1, random_state=1)
+    result = RollingWindow(shuffled, '6h', by=by).aggregate(shuffled[COLUMNS].to_numpy(), stat)
+    # Rows sharing a timestamp keep their input order, as in a stable sort
+    ordered = shuffled.sort_values('timestamp', kind='stable')
+    expected = pd.DataFrame(expected_rolling(ordered, stat, by), index=ordered.index).loc[shuffled.index].to_numpy()
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_masked_rows_match_pandas_on_nan_rows():
+    df = trips()
+    mask = np.random.default_rng(2).random(len(df)) > 0.3
+    out = RollingWindow(df, '6h', by='date').apply(df.copy(), COLUMNS, 'mean', mask=mask)
+    masked = df.copy()
+    masked.loc[~mask, COLUMNS] = np.nan
+    np.testing.assert_allclose(out[[col + '_rolling' for col in COLUMNS]].to_numpy(), expected_rolling(masked, 'mean', 'date'), rtol=1e-12, atol=1e-12)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.features.build_model_features import BuildModelFeatures
+from src.features.rollup_cube import TimeRollupCube
+
+
+def trips(n: int = 200, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 3 * 86400, n), unit='s')
+    return pd.DataFrame({
+        'date': timestamps.normalize(),
+        'hour': timestamps.hour.astype('int64'),
+        'count_per_mile': rng.uniform(0.1, 5, n),
+    })
+
+
+def is_sorted(df: pd.DataFrame) -> bool:
+    key = (df['date'].to_numpy(dtype='datetime64[h]').astype('int64') + df['hour'].to_numpy()).astype('int64')
+    return bool(np.all(key[1:] >= key[:-1]))
+
+
+@pytest.mark.parametrize('masked', [False, True])
+def test_row_order_sorts_unsorted_rows(masked):
+    df = trips()
+    mask = np.random.default_rng(1).random(len(df)) > 0.3 if masked else None
+    order = TimeRollupCube.from_frame(df, ModelConfig(), columns=('count_per_mile',), mask=mask).row_order()
+    assert order is not None
+    ordered = df.take(order)
+    valid = ordered if mask is None else ordered[mask[order]]
+    assert is_sorted(valid)
+
+
+def test_row_order_ignores_masked_rows_in_sorted_frame():
+    df = trips().sort_values(['date', 'hour'], kind='stable').reset_index(drop=True)
+    mask = np.ones(len(df), dtype=bool)
+    # A masked row out of place does not make the frame unsorted
+    df.loc[0, ['date', 'hour']] = [df['date'].max(), 23]
+    mask[0] = False
+    cube = TimeRollupCube.from_frame(df, ModelConfig(), columns=('count_per_mile',), mask=mask)
+    assert cube.row_order() is None
+    assert TimeRollupCube.from_frame(df, ModelConfig(), columns=('count_per_mile',)).row_order() is not None
+
+
+@pytest.mark.parametrize('validity_mask', [False, True])
+def test_model_builder_demand_features_in_date_hour_order(tmp_path, validity_mask):
+    dc = DataConfig(validity_mask=validity_mask, feature_cache=False)
+    paths = SimpleNamespace(get_path=lambda key: tmp_path / key)
+    builder = BuildModelFeatures(SimpleNamespace(data_config=dc, model_config=ModelConfig(), paths=paths))
+    df = trips()
+    if validity_mask:
+        df = builder.validity.filter(df, df['count_per_mile'] > 1)
+    df = builder.validity.compact(builder.build_demand_features(df))
+    assert is_sorted(df)
+
+
+def test_sorted_cube_broadcasts_like_a_rebuilt_one():
+    df = trips()
+    cube = TimeRollupCube.from_frame(df, ModelConfig(), columns=('count_per_mile',))
+    order = cube.row_order()
+    ordered = df.take(order)
+    moved = cube.take(order)
+    assert moved.covers(ordered, ('count_per_mile',)) and not cube.covers(ordered, ('count_per_mile',))
+    rebuilt = TimeRollupCube.from_frame(ordered, ModelConfig(), columns=('count_per_mile',))
+    for level in ['hour', '3h', '6h', 'day']:
+        np.testing.assert_array_equal(moved.broadcast(level, 'count_per_mile', 'sum'), rebuilt.broadcast(level, 'count_per_mile', 'sum'))
+
+
+@pytest.mark.parametrize('validity_mask', [False, True])
+def test_demand_and_bound_steps_share_one_scan(tmp_path, monkeypatch, validity_mask):
+    dc = DataConfig(validity_mask=validity_mask, feature_cache=False)
+    paths = SimpleNamespace(get_path=lambda key: tmp_path / key)
+    builder = BuildModelFeatures(SimpleNamespace(data_config=dc, model_config=ModelConfig(), paths=paths))
+    scans = []
+    from_frame = TimeRollupCube.from_frame.__func__
+    monkeypatch.setattr(TimeRollupCube, 'from_frame', classmethod(lambda cls, *args, **kwargs: scans.append(1) or from_frame(cls, *args, **kwargs)))
+    df = trips()
+    df = builder.validity.filter(df, df['count_per_mile'] > 1)
+    builder.build_bound_features(builder.build_demand_features(df))
+    assert len(scans) == 1
+    # A changed mask means different rows, so the next step scans again
+    df = builder.validity.filter(df, df['count_per_mile'] > 2)
+    builder.build_bound_features(df)
+    assert len(scans) == 2
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.data import DataConfig
+from config.model import ModelConfig
+from src.features.build_model_features import BuildModelFeatures
+from src.features.scaling import FeatureScaler
+
+
+def test_missing_bounds_file_names_path_and_fit_scalers(tmp_path):
+    paths = SimpleNamespace(get_path=lambda key: tmp_path / key)
+    state = SimpleNamespace(data_config=DataConfig(fit_scalers=False), model_config=ModelConfig(), paths=paths)
+    with pytest.raises(FileNotFoundError, match='fit_scalers=True') as error:
+        BuildModelFeatures(state)
+    assert str(tmp_path / 'scalers' / 'model_features.json') in str(error.value)
+
+
+def test_fit_without_valid_rows_raises():
+    df = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0]})
+    with pytest.raises(ValueError, match='no valid rows'):
+        FeatureScaler().fit(df, ['a', 'b'], mask=np.zeros(len(df), dtype=bool))
+    with pytest.raises(ValueError, match='no valid rows'):
+        FeatureScaler().fit(df.iloc[:0], ['a', 'b'])
+
+
+def test_saved_bounds_round_trip(tmp_path):
+    df = pd.DataFrame({'a': [1.0, np.nan, 3.0], 'b': [5.0, 5.0, 5.0]})
+    scaler = FeatureScaler().fit(df, ['a', 'b'])
+    scaler.save(tmp_path / 'bounds.json')
+    loaded = FeatureScaler.load(tmp_path / 'bounds.json')
+    assert loaded.params == scaler.params
+    np.testing.assert_array_equal(loaded.transform(df.copy(), ['a', 'b'])['a_scaled'], [0.0, np.nan, 1.0])
@@ -39,22 +39,27 @@ class TaskExecutor:
 
         else:
             load_path = self.paths.get_path(load_path)
-            with FileAccess.load_file(load_path) as df:
+            with FileAccess.load_file(load_path, self.data_config.date_range) as df:
                 self._parent_save_helper(step, df, load_path, save_paths)
 
+    def _save(self, result: pd.DataFrame, key: Union[str, Path]):
+        """Partitioned keys are written as hive datasets; a date-range run only replaces its own partitions"""
+        FileAccess.save_file(
+            result, self.paths.get_path(key), self.data_config.overwrite,
+            partitioned=key in self.data_config.partitioned,
+            replace_all=self.data_config.date_range is None)
+
     def _parent_save_helper(self, step, df, load_path, save_paths):
         if save_paths is not None:
             if isinstance(save_paths, str):
-                save_paths = self.paths.get_path(save_paths)
-                logged_step = log_step(load_path, save_paths)(step)
+                logged_step = log_step(load_path, self.paths.get_path(save_paths))(step)
                 result = logged_step(df)
-                FileAccess.save_file(result, save_paths, self.data_config.overwrite)
+                self._save(result, save_paths)
             if isinstance(save_paths, list):
-                save_paths = [self.paths.get_path(path) for path in save_paths]
-                for path in save_paths:
-                    logged_step = log_step(load_path, save_paths)(step)
+                for key in save_paths:
+                    logged_step = log_step(load_path, [self.paths.get_path(path) for path in save_paths])(step)
                     result = logged_step(df)
-                    FileAccess.save_file(result, path, self.data_config.overwrite)
+                    self._save(result, key)
         else:
             logged_step = log_step(load_path, save_paths)(step)
             result = logged_step(df)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+import pandas as pd
+
+from utils.execution import TaskExecutor
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+# Code a feature step can reach: builders, their kernels, configs and the shared utils
+FEATURE_CODE_DIRS = ['src/features', 'config', 'utils']
+
+
+@lru_cache(maxsize=None)
+def code_version() -> str:
+    """Hash of every module under ``FEATURE_CODE_DIRS``, so editing any helper a step calls changes cache keys."""
+    digest = hashlib.blake2b(digest_size=16)
+    for directory in FEATURE_CODE_DIRS:
+        for path in sorted((ROOT_DIR / directory).rglob('*.py')):
+            digest.update(path.relative_to(ROOT_DIR).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Memoize feature steps by (input fingerprint, feature name).
+
+    Keys are chained: a step's key hashes its input's key, the step's qualified name and the feature
+    code version, so only the root frame is ever hashed. Hits are served from a size-bounded in-memory
+    LRU first, then, when ``persist`` is set, from parquet files on disk written by earlier runs (also
+    size-bounded, least recently used evicted first).
+    """
+
+    def __init__(self, cache_dir: Path, max_memory_mb: int = 2048, max_disk_mb: int = 10240, salt: str = '', persist: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.persist = persist
+        self.max_memory_bytes = max_memory_mb * 1024**2
+        self.max_disk_bytes = max_disk_mb * 1024**2
+        self.salt = salt
+        self.memory: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = {'memory': 0, 'disk': 0, 'miss': 0}
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(list(zip(df.columns, df.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def derive(self, fingerprint: str, step: Callable) -> str:
+        """Key of ``step``'s output: steps are identified by qualified name, so builders share only steps they
+        inherit from the same definition, and the code version covers everything the step calls."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in [fingerprint, f'{step.__module__}.{step.__qualname__}', code_version(), self.salt]:
+            digest.update(part.encode())
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.parquet'
+
+    def contains(self, key: str) -> bool:
+        return key in self.memory or (self.persist and self._disk_path(key).exists())
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits['memory'] += 1
+            return self.memory[key].copy(deep=False)
+        path = self._disk_path(key)
+        if self.persist and path.exists():
+            path.touch()
+            df = pd.read_parquet(path)
+            self.hits['disk'] += 1
+            self._remember(key, df)
+            return df.copy(deep=False)
+        self.hits['miss'] += 1
+        return None
+
+    def put(self, key: str, df: pd.DataFrame):
+        self._remember(key, df.copy(deep=False))
+        if self.persist:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(self._disk_path(key))
+            self._evict_disk()
+
+    def _remember(self, key: str, df: pd.DataFrame):
+        size = int(df.memory_usage(index=True, deep=False).sum())
+        if size > self.max_memory_bytes:
+            return
+        if key in self.memory:
+            self.memory_bytes -= int(self.memory.pop(key).memory_usage(index=True, deep=False).sum())
+        self.memory[key] = df
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= int(evicted.memory_usage(index=True, deep=False).sum())
+
+    def _evict_disk(self):
+        files = sorted(self.cache_dir.glob('*.parquet'), key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        while files and total > self.max_disk_bytes:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+
+    def run_steps(self, steps: List[Callable], df: pd.DataFrame, cached: Iterable[str]) -> pd.DataFrame:
+        """Run a builder's steps, resuming after the last step (named in ``cached``) already cached."""
+        cached = set(cached)
+        keys, key = [], self.fingerprint(df)
+        for step in steps:
+            key = self.derive(key, step)
+            keys.append(key)
+
+        start = 0
+        for i in reversed(range(len(steps))):
+            if steps[i].__name__ in cached and self.contains(keys[i]):
+                hit = self.get(keys[i])
+                if hit is not None:
+                    df, start = hit, i + 1
+                    logging.info(f"Feature cache hit for `{steps[i].__name__}`, skipping {start} steps")
+                    break
+
+        for step, key in zip(steps[start:], keys[start:]):
+            df = TaskExecutor.run_child_step(step, df)
+            if step.__name__ in cached:
+                self.put(key, df)
+        logging.debug(f"Feature cache stats: {self.hits}, {self.memory_bytes / 1024**2:.1f} MB in memory")
+        return df
@@ -1,11 +1,31 @@
 from __future__ import annotations
 
+import csv
+import itertools
 import json
 import logging
+import shutil
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+PARTITION_COLUMNS = ['p_year', 'p_month', 'p_date']
+PARTITIONING = ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS]), flavor='hive')
+# pyarrow's write_dataset defaults (1024 each) are below the ~2,200 dates of the Uber history
+MAX_OPEN_FILES = 1024
+STREAM_MAX_PARTITIONS = 1 << 16
 
 
 class FileAccess:
@@ -15,21 +35,23 @@ class FileAccess:
 
     @staticmethod
     @contextmanager
-    def load_file(path: Path):
+    def load_file(path: Path, date_range: Optional[Tuple[str, str]] = None, columns: Optional[List[str]] = None):
         path = Path(path)
         suffix = FileAccess.extract_suffix(path)
         logging.debug(f'Reading file: ``{path}``')
-        if suffix == '.parquet':
-            df = pd.read_parquet(path)
+        if path.is_dir():
+            df = FileAccess.load_dataset(path, date_range, columns)
+        elif suffix == '.parquet':
+            df = pd.read_parquet(path, columns=columns)
         elif suffix == '.csv':
-            df = pd.read_csv(path)
+            df = pd.read_csv(path, usecols=columns)
         elif suffix == '.xlsx':
             df = pd.read_excel(path)
         elif suffix == '.json':
             df = pd.read_json(path)
         else:
             raise ValueError(f'Unknown file type: {suffix}')
-        yield df
+        yield df if columns is None else df[columns]
 
     @staticmethod
     def save_helper(df: pd.DataFrame, path: Path):
@@ -47,14 +69,155 @@ class FileAccess:
 
     @staticmethod
     @contextmanager
-    def save_file(df: pd.DataFrame, path: Path, overwrite=False):
+    def save_file(df: pd.DataFrame, path: Path, overwrite=False, partitioned=False, replace_all=True):
         path = Path(path)
         if overwrite is False and path.exists():
             logging.warning(f'File already exists: ``{path}``')
+        elif partitioned:
+            logging.debug(f'Saving partitioned dataset: ``{path}``')
+            FileAccess.save_dataset(df, path, replace_all)
         else:
             logging.debug(f'Saving file: ``{path}``')
+            if path.is_dir():
+                shutil.rmtree(path)
             FileAccess.save_helper(df, path)
 
+    @staticmethod
+    def partition_values(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Hive partition keys (year/month/date strings) from ``date``, else ``timestamp`` (datetime or ISO string)."""
+        col = df['date'] if 'date' in df.columns else df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(col):
+            codes, days = pd.factorize(col.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]'))
+            days = np.datetime_as_string(np.asarray(days, dtype='datetime64[D]'))
+        else:
+            codes, days = pd.factorize(col.astype(str).str[:10])
+            days = np.asarray(days, dtype=str)
+        keys = {
+            'p_year': np.array([day[:4] for day in days], dtype=object),
+            'p_month': np.array([day[5:7] for day in days], dtype=object),
+            'p_date': np.array(days, dtype=object),
+        }
+        return {name: values[codes] for name, values in keys.items()}
+
+    @staticmethod
+    def save_dataset(df: pd.DataFrame, path: Path, replace_all=True):
+        """Write ``df`` as a hive-partitioned (``p_year=/p_month=/p_date=``) parquet dataset.
+
+        ``replace_all`` clears the whole dataset first; otherwise only the partitions present in ``df``
+        are replaced (e.g. when a run was restricted to a date range).
+        """
+        if path.is_file() or (replace_all and path.exists()):
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        table = FileAccess.partition_table(df)
+        n_dates = max(1, len(pc.unique(table['p_date'])))
+        ds.write_dataset(
+            table, path, format='parquet', partitioning=PARTITIONING, basename_template='part-{i}.parquet',
+            existing_data_behavior='delete_matching', preserve_order=True,
+            max_partitions=n_dates, max_open_files=max(MAX_OPEN_FILES, n_dates))
+
+    @staticmethod
+    def partition_table(df: pd.DataFrame, schema: Optional[pa.Schema] = None) -> pa.Table:
+        """``df`` as an arrow table with its hive partition key columns appended"""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for col, values in FileAccess.partition_values(df).items():
+            table = table.append_column(col, pa.array(values, type=pa.string()))
+        return table if schema is None else table.cast(schema)
+
+    @staticmethod
+    def save_chunks(chunks: Iterator[pd.DataFrame], path: Path, partitioned=False):
+        """Write frames to parquet as they arrive, holding one at a time.
+
+        Each frame is appended as row groups of one file, or of the hive dataset when ``partitioned``. The
+        first frame fixes the schema; later frames are cast to it. A partitioned stream may span any number
+        of dates (up to ``STREAM_MAX_PARTITIONS``); at most ``MAX_OPEN_FILES`` stay open, so frames that
+        are not in date order leave several files per date.
+        """
+        path = Path(path)
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if first is None:
+            logging.warning(f'Nothing to write to ``{path}``')
+            return
+        if path.exists():
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        if partitioned:
+            first = FileAccess.partition_table(first)
+            tables = itertools.chain([first], (FileAccess.partition_table(chunk, first.schema) for chunk in chunks))
+            ds.write_dataset(
+                (batch for table in tables for batch in table.to_batches()), path, schema=first.schema,
+                format='parquet', partitioning=PARTITIONING, basename_template='part-{i}.parquet',
+                existing_data_behavior='delete_matching', preserve_order=True,
+                max_partitions=STREAM_MAX_PARTITIONS, max_open_files=MAX_OPEN_FILES)
+            return
+        first = pa.Table.from_pandas(first, preserve_index=False)
+        with pq.ParquetWriter(path, first.schema) as writer:
+            writer.write_table(first)
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, preserve_index=False).cast(first.schema))
+
+    @staticmethod
+    def date_filter(schema: pa.Schema, date_range: Tuple[str, str]) -> ds.Expression:
+        """Inclusive date range on the partition keys, plus the date/timestamp column for row-group statistics."""
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        expression = (ds.field('p_date') >= start.strftime('%Y-%m-%d')) & (ds.field('p_date') <= end.strftime('%Y-%m-%d'))
+        for col in ['date', 'timestamp']:
+            if col in schema.names and pa.types.is_timestamp(schema.field(col).type):
+                expression &= (ds.field(col) >= start) & (ds.field(col) < end + pd.Timedelta(days=1))
+                break
+        return expression
+
+    @staticmethod
+    def load_dataset(path: Path, date_range: Optional[Tuple[str, str]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+        expression = None if date_range is None else FileAccess.date_filter(dataset.schema, date_range)
+        columns = columns or [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+        table = dataset.to_table(columns=columns, filter=expression)
+        logging.debug(f'Read {table.num_rows} rows from {len(dataset.files)} files in ``{path}`` (date range: {date_range})')
+        return table.to_pandas()
+
+    @staticmethod
+    def iter_chunks(path: Path, chunk_rows: int, date_range: Optional[Tuple[str, str]] = None) -> Iterator[pd.DataFrame]:
+        """Stream a parquet file, hive dataset or csv as frames of at most ``chunk_rows`` rows, in file order."""
+        path = Path(path)
+        if path.suffix == '.csv' and not path.is_dir():
+            yield from pd.read_csv(path, chunksize=chunk_rows)
+            return
+        partitioning = PARTITIONING if path.is_dir() else None
+        dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+        expression = None if date_range is None or not path.is_dir() else FileAccess.date_filter(dataset.schema, date_range)
+        columns = [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    @staticmethod
+    def csv_header(path: Path) -> List[str]:
+        """Column names as ``pd.read_csv`` gives them (a blank header becomes ``Unnamed: <i>``)"""
+        with open(path, newline='') as file:
+            header = next(csv.reader(file))
+        return [name if name else f'Unnamed: {i}' for i, name in enumerate(header)]
+
+    @staticmethod
+    def csv_read_options(path: Path, block_mb: int = 64) -> pv.ReadOptions:
+        return pv.ReadOptions(
+            column_names=FileAccess.csv_header(path), skip_rows=1, block_size=block_mb * 1024**2, use_threads=True)
+
+    @staticmethod
+    def load_csv(path: Path, convert_options: Optional[pv.ConvertOptions] = None) -> pd.DataFrame:
+        """Whole csv through pyarrow's multithreaded parser, typed by ``convert_options``"""
+        return pv.read_csv(path, read_options=FileAccess.csv_read_options(path), convert_options=convert_options).to_pandas()
+
+    @staticmethod
+    def iter_csv_blocks(path: Path, block_mb: int = 64, convert_options: Optional[pv.ConvertOptions] = None) -> Iterator[pd.DataFrame]:
+        """Stream a csv as frames of about ``block_mb`` of text each, parsed by pyarrow's threaded reader.
+
+        Column types not fixed by ``convert_options`` are inferred on the first block.
+        """
+        reader = pv.open_csv(path, read_options=FileAccess.csv_read_options(path, block_mb), convert_options=convert_options)
+        for batch in reader:
+            if batch.num_rows:
+                yield batch.to_pandas()
+
     @staticmethod
     @contextmanager
     def save_json(data, path, overwrite=False):
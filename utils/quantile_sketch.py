@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+SKETCH_CHUNK_ROWS = 1 << 16
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch.
+
+    Values land in level 0. A level that outgrows its capacity is sorted and every other item (random
+    offset) moves up a level with double the weight; capacities shrink by 2/3 per level below the top
+    (``k``), so a sketch of n values holds at most about ``3k + log2(n / k)`` items. Sketches built over
+    chunks, date partitions or worker shards ``merge`` level by level into a sketch of the union.
+
+    Error: a returned quantile's true rank is within ``rank_error`` of the requested one with ~99%
+    probability, independent of n and of how the input was chunked or merged (~1.3% at k=200, ~0.3% at
+    k=1000). Until the first compaction (n up to ~k values) quantiles are exact, interpolated like pandas.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        if k < 8:
+            raise ValueError(f'Sketch size k must be at least 8, got {k}')
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.n = 0
+        self.compacted = False
+
+    @property
+    def rank_error(self) -> float:
+        """Empirical ~99% bound on the normalized rank error, fitted as in Apache DataSketches' KLL"""
+        return 2.296 / self.k ** 0.9723
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values) -> QuantileSketch:
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        if other.k != self.k:
+            raise ValueError(f'Cannot merge sketches of size {self.k} and {other.k}')
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.compacted |= other.compacted
+        self._compress()
+        return self
+
+    def _compress(self):
+        while True:
+            full = [level for level, items in enumerate(self.levels) if len(items) > self.capacity(level)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind; the rest halve into the next level
+            odd = len(items) % 2
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[odd + self.rng.integers(2)::2]])
+            self.compacted = True
+
+    def quantile(self, q: Union[float, List[float]]) -> Union[float, np.ndarray]:
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if not self.compacted:
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level) for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+        # Each item sits at the middle of the rank range its weight covers
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(q, positions, items)
+
+    @classmethod
+    def from_values(cls, values, k: int = 200, chunk_rows: int = SKETCH_CHUNK_ROWS, seed: int = 0) -> QuantileSketch:
+        """Sketch of one column, fed ``chunk_rows`` at a time"""
+        values = pd.Series(values, copy=False).to_numpy(dtype='float64', na_value=np.nan)
+        sketch = cls(k, seed)
+        for start in range(0, len(values), chunk_rows):
+            sketch.update(values[start:start + chunk_rows])
+        return sketch
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable, k: int = 200) -> QuantileSketch:
+        """Sketch of a stream of arrays (chunks, partitions), each sketched on its own and merged"""
+        sketch = cls(k)
+        for i, chunk in enumerate(chunks):
+            sketch.merge(cls.from_values(chunk, k, seed=i + 1))
+        return sketch
+
+
+def quantiles(values: Union[pd.Series, np.ndarray], q: List[float], k: Optional[int] = None) -> np.ndarray:
+    """``values.quantile(q)`` (NaNs skipped), exactly when ``k`` is None, else from a ``QuantileSketch``"""
+    if k is None:
+        return pd.Series(values).quantile(q).to_numpy()
+    return QuantileSketch.from_values(values, k).quantile(q)
@@ -3,13 +3,12 @@ from __future__ import annotations
 import logging
 from pathlib import Path
 
-import pandas as pd
-
 from utils.file_access import FileAccess
 
 
 def view_file(filepath):
-    x = pd.read_parquet(filepath)
+    with FileAccess.load_file(filepath) as x:
+        pass
     logging.info(x)
     return x
 